@@ -0,0 +1,146 @@
+import numpy as np
+import orjson
+from datetime import date, datetime, time
+from sqlalchemy import String, func, type_coerce
+
+# Vectorized helpers for reporting endpoints. Inputs are flat NumPy arrays
+# built straight from query rows, so a report costs one pass over the data
+# instead of a Python loop per group.
+
+PERCENTILES = (50, 95, 99)
+
+
+def to_datetime64(values) -> np.ndarray:
+    """Convert a sequence of datetimes (None allowed) to datetime64[us], None becoming NaT"""
+    return np.array(values, dtype="datetime64[us]")
+
+
+def datetime_text(column, dialect: str):
+    """
+    Select a datetime column as ISO text. NumPy parses text far faster than
+    it converts datetime objects, and the driver skips building them.
+    """
+    if dialect == "mysql":
+        return func.date_format(column, "%Y-%m-%d %H:%i:%s.%f")
+    # SQLite already stores datetimes as ISO text
+    return type_coerce(column, String)
+
+
+def as_datetime(value) -> datetime:
+    """A datetime from a bucket or date column; these come back as strings on SQLite"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return datetime.fromisoformat(value)
+
+
+def seconds_between(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Elementwise end - start in float seconds; NaN where either side is missing"""
+    return (end - start) / np.timedelta64(1, "s")
+
+
+def grouped_percentiles(groups: np.ndarray, values: np.ndarray, percentiles=PERCENTILES):
+    """
+    Percentiles of values per group, computed with a single sort.
+
+    NaN values are ignored. Returns (unique_groups, counts, table) where
+    table[i, j] is percentiles[j] of group unique_groups[i], using the same
+    linear interpolation as np.percentile.
+    """
+    mask = ~np.isnan(values)
+    groups, values = groups[mask], values[mask]
+    if values.size == 0:
+        return groups[:0], np.zeros(0, dtype=np.int64), np.empty((0, len(percentiles)))
+
+    # Sort by group, then by value within the group
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    unique_groups, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+
+    q = np.asarray(percentiles, dtype=float) / 100.0
+    pos = starts[:, None] + (counts[:, None] - 1) * q[None, :]
+    lower = np.floor(pos).astype(np.int64)
+    upper = np.ceil(pos).astype(np.int64)
+    table = values[lower] + (values[upper] - values[lower]) * (pos - lower)
+    return unique_groups, counts, table
+
+
+def hourly_counts(timestamps: np.ndarray):
+    """Number of events per hour bucket; returns (hour_starts, counts) sorted by hour"""
+    timestamps = timestamps[~np.isnat(timestamps)]
+    hours, counts = np.unique(timestamps.astype("datetime64[h]"), return_counts=True)
+    return hours, counts
+
+
+def interleave_movements(
+    id_prefix, dates, product_ids, transfer_ids,
+    out_location, in_location, out_quantity, in_quantity, notes=None
+) -> dict:
+    """
+    Build stock history columns from one row per movement source: each row
+    becomes an "out" item followed by an "in" item, as the history endpoints
+    have always listed them. All inputs are equal-length arrays; nullable
+    columns can be object arrays holding None.
+    """
+    n = len(dates)
+
+    def pair(outgoing, incoming):
+        # out0, in0, out1, in1, ...
+        return np.stack((np.asarray(outgoing), np.asarray(incoming)), axis=1).reshape(-1)
+
+    columns = {
+        "id": np.char.add(np.repeat(text_column(id_prefix, ""), 2), np.tile(np.array(["-out", "-in"]), n)),
+        "date": np.repeat(dates, 2),
+        "quantity": pair(out_quantity, in_quantity),
+        "type": np.tile(np.array(["out", "in"]), n),
+        "location": pair(out_location, in_location),
+        "product_id": np.repeat(product_ids, 2),
+        "transfer_id": np.repeat(transfer_ids, 2),
+    }
+    if notes is not None:
+        columns["notes"] = np.repeat(notes, 2)
+    return columns
+
+
+def text_column(values, missing: str) -> np.ndarray:
+    """Values (None allowed) as a str array, None replaced by missing"""
+    values = np.array(values, dtype=object)
+    if values.size == 0:
+        return np.array([], dtype=str)
+    values[values == None] = missing  # noqa: E711 - elementwise comparison
+    return values.astype(str)
+
+
+def product_index(product_ids: np.ndarray, values: np.ndarray):
+    """Positions of values in the sorted product_ids, and which values were found"""
+    index = np.searchsorted(product_ids, values)
+    found = index < len(product_ids)
+    found[found] = product_ids[index[found]] == values[found]
+    return index[found], found
+
+
+def select_rows(columns: dict, mask: np.ndarray) -> dict:
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def _json_values(values: np.ndarray) -> list:
+    if values.size == 0:
+        return []
+    if np.issubdtype(values.dtype, np.datetime64):
+        # Same text as datetime.isoformat(): no fraction when it is zero
+        text = np.datetime_as_string(values.astype("datetime64[us]"), unit="us")
+        return np.char.replace(text, ".000000", "").tolist()
+    return values.tolist()
+
+
+def columns_to_json(columns: dict, columnar: bool = False) -> bytes:
+    """
+    Serialize history columns. Columnar output is one array per field; row
+    output is the list of objects the endpoints return by default.
+    """
+    data = {name: _json_values(values) for name, values in columns.items()}
+    if columnar:
+        return orjson.dumps(data)
+    names = list(data)
+    return orjson.dumps([dict(zip(names, row)) for row in zip(*data.values())])
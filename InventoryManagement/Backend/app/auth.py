@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request, status
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
+from sqlalchemy import update
 import logging
 from pydantic import BaseModel, EmailStr
 from .schemas.user import UserCreate, UserLogin, TokenData
 from .models.user import User
 from .database import get_db
-from .utils import create_access_token, create_refresh_token, verify_token
+from .utils import (
+    create_access_token, create_refresh_token, verify_token, token_claims, password_pool, run_on_password_pool, get_current_user,
+    hash_password, verify_and_update_password
+)
 from dotenv import load_dotenv
 import os
 
@@ -30,7 +33,10 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                 detail=f"Invalid privilege level. Must be one of: {list(valid_privileges.values())}"
             )
             
-        hashed_pw = bcrypt.hash(user.password)
+        # ~250 ms of CPU on the password pool, which bounds how many run at
+        # once. End the transaction first so no pooled connection is held while waiting.
+        db.rollback()
+        hashed_pw = run_on_password_pool(hash_password, user.password)
         db_user = User(
             email=user.email,
             username=user.username,
@@ -52,6 +58,9 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
                 "role": valid_privileges[user.privileges]
             }
         }
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -68,15 +77,23 @@ def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db
                 detail="Invalid email or password"
             )
 
+        # Keep the loaded user but hand the connection back to the pool while
+        # the password is verified on the password pool
+        db.expunge(db_user)
+        db.rollback()
+
         # Use a try-catch block for bcrypt verification to handle potential issues
         try:
-            if not bcrypt.verify(user_data.password, db_user.hashed_password):
+            valid, new_hash = run_on_password_pool(
+                verify_and_update_password, user_data.password, db_user.hashed_password
+            )
+            if not valid:
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid email or password"
                 )
         except ValueError as e:
-            logger.error(f"BCrypt verification error: {str(e)}")
+            logger.error(f"Password verification error: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error verifying password"
@@ -95,8 +112,16 @@ def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db
                 detail="Please use admin login."
             )
 
+        if new_hash:
+            # Stored hash uses an outdated scheme or cost. A Core UPDATE, so the
+            # user's token version is not bumped: this is not a password change.
+            users = User.__table__
+            db.execute(update(users).where(users.c.id == db_user.id).values(hashed_password=new_hash))
+            db.commit()
+            logger.info(f"Rehashed password of user {db_user.id} with the current policy")
+
         # Generate tokens
-        token_data = {"sub": db_user.email, "privileges": db_user.privileges}
+        token_data = token_claims(db_user)
         access_token = create_access_token(token_data)
         refresh_token = create_refresh_token(token_data)
         
@@ -137,7 +162,7 @@ def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db
         )
 
 @router.post("/refresh", response_model=TokenData)
-def refresh_token(response: Response, request: Request):
+def refresh_token(response: Response, request: Request, db: Session = Depends(get_db)):
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
         raise HTTPException(status_code=401, detail="No refresh token")
@@ -147,8 +172,12 @@ def refresh_token(response: Response, request: Request):
         if not payload:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
             
-        email = payload.get("sub")
-        token_data = {"sub": email}
+        # Reload the user so new tokens carry current privileges, and refuse
+        # refresh tokens issued before a password or privilege change
+        db_user = db.query(User).filter(User.email == payload.get("sub")).first()
+        if not db_user or payload.get("ver", 0) != (db_user.token_version or 0):
+            raise HTTPException(status_code=401, detail="Invalid refresh token")
+        token_data = token_claims(db_user)
 
         new_access_token = create_access_token(token_data)
         new_refresh_token = create_refresh_token(token_data)
@@ -156,6 +185,15 @@ def refresh_token(response: Response, request: Request):
         response.set_cookie("access_token", new_access_token, httponly=True)
         response.set_cookie("refresh_token", new_refresh_token, httponly=True)
 
-        return {"access_token": new_access_token, "refresh_token": new_refresh_token}
+        return {
+            "access_token": new_access_token,
+            "refresh_token": new_refresh_token,
+            "user": {"email": db_user.email, "username": db_user.username, "privileges": db_user.privileges}
+        }
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+@router.get("/password-pool")
+async def get_password_pool_metrics(current_user = Depends(get_current_user)):
+    """Concurrency and queue-depth metrics of the password hashing pool"""
+    return password_pool.metrics()
@@ -0,0 +1,44 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlightCache:
+    """
+    Per-process async cache with a time-to-live.
+
+    When an entry is missing or expired, the first caller starts loading it
+    and every concurrent caller awaits that same load instead of starting
+    its own, so a burst of requests costs one computation.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._values.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, load))
+            self._inflight[key] = future
+        # A cancelled caller must not cancel the load the others are waiting on
+        return await asyncio.shield(future)
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await load()
+            self._values[key] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
@@ -0,0 +1,134 @@
+import logging
+import os
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models.order import Order, OrderItem
+from .models.product import Product
+from .models.stock_movement import StockMovementDaily
+from .analytics import product_index
+from .replenishment import demand_statistics
+
+logger = logging.getLogger(__name__)
+
+# Days of sales and demand history the classes are computed over
+CLASSIFICATION_WINDOW_DAYS = int(os.getenv("CLASSIFICATION_WINDOW_DAYS", "90"))
+# Cumulative revenue share closing the A and B classes
+ABC_A_SHARE = float(os.getenv("ABC_A_SHARE", "0.8"))
+ABC_B_SHARE = float(os.getenv("ABC_B_SHARE", "0.95"))
+# Coefficient of variation of daily demand closing the X and Y classes
+XYZ_X_CV = float(os.getenv("XYZ_X_CV", "0.5"))
+XYZ_Y_CV = float(os.getenv("XYZ_Y_CV", "1.0"))
+
+UPDATE_CHUNK = 5000
+
+
+def abc_classes(revenue: np.ndarray, a_share: float = ABC_A_SHARE, b_share: float = ABC_B_SHARE) -> np.ndarray:
+    """
+    A/B/C per product from its share of total revenue.
+
+    Products are ranked by revenue; a product is A while the revenue ranked
+    above it is below a_share of the total (so the product crossing the line
+    is still A), B likewise up to b_share, otherwise C. No revenue is C.
+    """
+    classes = np.full(len(revenue), "C", dtype="<U1")
+    total = revenue.sum()
+    if total <= 0:
+        return classes
+
+    order = np.argsort(-revenue, kind="stable")
+    ranked = revenue[order]
+    share_before = (np.cumsum(ranked) - ranked) / total
+    ranked_classes = np.where(share_before < a_share, "A", np.where(share_before < b_share, "B", "C"))
+    ranked_classes[ranked <= 0] = "C"
+    classes[order] = ranked_classes
+    return classes
+
+
+def xyz_classes(mean: np.ndarray, variance: np.ndarray, x_cv: float = XYZ_X_CV, y_cv: float = XYZ_Y_CV) -> np.ndarray:
+    """X/Y/Z per product from the coefficient of variation of daily demand; no demand is Z"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cv = np.where(mean > 0, np.sqrt(variance) / np.where(mean > 0, mean, 1), np.inf)
+    return np.where(cv <= x_cv, "X", np.where(cv <= y_cv, "Y", "Z"))
+
+
+def classify_products(db: Session, window_days: int = CLASSIFICATION_WINDOW_DAYS) -> dict:
+    """
+    Recompute abc_class and xyz_class for every product.
+
+    Revenue is quantity times price of completed sell orders approved in the
+    window; demand is the daily stock leaving each product from the movement
+    rollup, as used by the replenishment job. Returns class counts.
+    """
+    started = datetime.utcnow()
+    since = started.date() - timedelta(days=window_days)
+    connection = db.connection()
+    products = Product.__table__
+
+    product_ids = np.array(connection.execute(select(products.c.id).order_by(products.c.id)).scalars().all(), dtype=np.int64)
+
+    orders = Order.__table__
+    items = OrderItem.__table__
+    rows = connection.execute(
+        select(items.c.product_id, func.sum(items.c.quantity * items.c.price))
+        .select_from(items.join(orders, orders.c.id == items.c.order_id))
+        .where(orders.c.order_type == "sell", orders.c.status == "completed", orders.c.updated_at >= since)
+        .group_by(items.c.product_id)
+    ).all()
+    sold_products, sold_revenue = zip(*rows) if rows else ((), ())
+    index, found = product_index(product_ids, np.array(sold_products, dtype=np.int64))
+    revenue = np.zeros(len(product_ids))
+    revenue[index] = np.array(sold_revenue, dtype=np.float64)[found]
+
+    movements = StockMovementDaily.__table__
+    daily = func.sum(movements.c.qty_out)
+    rows = connection.execute(
+        select(movements.c.product_id, daily)
+        .where(movements.c.day > since)
+        .group_by(movements.c.product_id, movements.c.day)
+        .having(daily > 0)
+    ).all()
+    demand_products, demand_qty = zip(*rows) if rows else ((), ())
+    mean, variance = demand_statistics(
+        product_ids,
+        np.array(demand_products, dtype=np.int64),
+        np.array(demand_qty, dtype=np.float64),
+        window_days
+    )
+
+    abc = abc_classes(revenue)
+    xyz = xyz_classes(mean, variance)
+
+    # One UPDATE per class pair and chunk of ids; updated_at is left alone
+    pairs = np.char.add(abc, xyz)
+    for pair in np.unique(pairs):
+        ids = product_ids[pairs == pair].tolist()
+        for offset in range(0, len(ids), UPDATE_CHUNK):
+            db.execute(
+                update(products)
+                .where(products.c.id.in_(ids[offset:offset + UPDATE_CHUNK]))
+                .values(abc_class=pair[0], xyz_class=pair[1], updated_at=products.c.updated_at)
+            )
+
+    counts = {
+        "abc": {label: int((abc == label).sum()) for label in "ABC"},
+        "xyz": {label: int((xyz == label).sum()) for label in "XYZ"},
+    }
+    logger.info(
+        f"Classified {len(product_ids)} products in {(datetime.utcnow() - started).total_seconds():.2f}s: "
+        f"{counts['abc']} {counts['xyz']}"
+    )
+    return counts
+
+
+if __name__ == "__main__":
+    # For cron: python -m app.classification
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = SessionLocal()
+    try:
+        classify_products(session)
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from sqlalchemy import event, inspect
+from .database import SessionLocal
+from .models.stock_transfer import StockTransfer
+from .models.order import Order
+
+logger = logging.getLogger(__name__)
+
+# How many recent events are kept so reconnecting clients can resume
+EVENT_HISTORY_SIZE = 1000
+# Per-client queue bound; a client that falls this far behind is disconnected
+# and resumes from the history buffer using Last-Event-ID
+CLIENT_QUEUE_SIZE = 100
+
+
+class Subscription:
+    """A single connected client with its own bounded queue"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.backlog = []
+        self.reset = False
+        self.overflowed = False
+
+    def deliver(self, evt):
+        # Always runs on the subscriber's own event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(evt)
+        except asyncio.QueueFull:
+            # Drop the buffered events and tell the stream to end; the client
+            # reconnects with Last-Event-ID and replays from history instead
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class EventBroker:
+    """
+    In-process pub/sub for status change events.
+
+    Events get monotonically increasing ids and are kept in a ring buffer so
+    a client can resume after a reconnect without missing anything.
+    """
+
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE, queue_size: int = CLIENT_QUEUE_SIZE):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self.queue_size = queue_size
+
+    def publish(self, event_type: str, data: dict) -> int:
+        with self._lock:
+            event_id = next(self._ids)
+            self._last_id = event_id
+            evt = (event_id, event_type, data)
+            self._history.append(evt)
+            subscribers = list(self._subscribers)
+
+        # Publishing may happen from a worker thread, so hand off to each loop
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.deliver, evt)
+            except RuntimeError:
+                # Loop already closed; the stream's cleanup will unsubscribe it
+                pass
+        return event_id
+
+    def subscribe(self, last_event_id: int = None) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            # Register and snapshot the backlog under the same lock so no event
+            # is both missed and not replayed
+            self._subscribers.add(sub)
+            if last_event_id is not None:
+                oldest_id = self._history[0][0] if self._history else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest_id - 1:
+                    # Unknown id (server restarted or history rolled over)
+                    sub.reset = True
+                else:
+                    sub.backlog = [evt for evt in self._history if evt[0] > last_event_id]
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broker = EventBroker()
+
+
+def format_sse(evt) -> str:
+    event_id, event_type, data = evt
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _transfer_payload(transfer: StockTransfer, previous_status) -> dict:
+    return {
+        "id": transfer.id,
+        "product_id": transfer.product_id,
+        "source_location": transfer.source_location,
+        "destination_location": transfer.destination_location,
+        "quantity": transfer.quantity,
+        "status": transfer.status,
+        "previous_status": previous_status,
+        "updated_at": transfer.updated_at,
+    }
+
+
+def _order_payload(order: Order, previous_status) -> dict:
+    return {
+        "id": order.id,
+        "order_type": order.order_type,
+        "status": order.status,
+        "previous_status": previous_status,
+        "updated_at": order.updated_at,
+    }
+
+
+# Status changes are collected during flush and only published after the
+# transaction commits, so clients never see changes that were rolled back
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_status_changes(session, flush_context):
+    pending = session.info.setdefault("pending_events", [])
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, StockTransfer):
+            event_type, build = "stock_transfer", _transfer_payload
+        elif isinstance(obj, Order):
+            event_type, build = "order", _order_payload
+        else:
+            continue
+
+        history = inspect(obj).attrs.status.history
+        if obj in session.new:
+            previous_status = None
+        elif history.has_changes():
+            previous_status = history.deleted[0] if history.deleted else None
+        else:
+            continue
+        pending.append((event_type, build(obj, previous_status)))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_status_changes(session):
+    for event_type, data in session.info.pop("pending_events", []):
+        broker.publish(event_type, data)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_status_changes(session):
+    session.info.pop("pending_events", None)
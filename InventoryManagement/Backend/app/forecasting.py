@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from .analytics import to_datetime64
+from .database import SessionLocal
+from .models.forecast import ProductForecast
+from .models.order import Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+# Days of sell-order history the models are fitted on
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "180"))
+# Days ahead that are forecast and stored
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "30"))
+# Worker processes for the fits; 1 fits in the calling process (on a thread in the app)
+FORECAST_WORKERS = int(os.getenv("FORECAST_WORKERS", str(os.cpu_count() or 1)))
+# Products per worker task
+FORECAST_CHUNK_SIZE = int(os.getenv("FORECAST_CHUNK_SIZE", "2000"))
+
+# Weekly seasonality for Holt-Winters
+SEASON_LENGTH = 7
+
+SES_ALPHAS = np.linspace(0.05, 0.95, 19)
+HW_GRID = np.array([
+    (alpha, beta, gamma)
+    for alpha in (0.1, 0.3, 0.5, 0.7, 0.9)
+    for beta in (0.01, 0.05, 0.1, 0.2)
+    for gamma in (0.05, 0.1, 0.3)
+])
+
+
+def fit_ses(y: np.ndarray, alphas: np.ndarray = SES_ALPHAS):
+    """
+    Simple exponential smoothing for many series at once.
+
+    y is (series, days). Every alpha in the grid is run for every series in
+    one pass over the days; each series keeps the alpha with the lowest sum
+    of squared one-step errors. Returns (level, sse, alpha) per series.
+    """
+    a = alphas[:, None]
+    level = np.repeat(y[None, :, 0], len(alphas), axis=0)
+    sse = np.zeros_like(level)
+    for t in range(1, y.shape[1]):
+        error = y[None, :, t] - level
+        sse += error * error
+        level = level + a * error
+
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(y.shape[0])
+    return level[best, columns], sse[best, columns], alphas[best]
+
+
+def fit_holt_winters(y: np.ndarray, grid: np.ndarray = HW_GRID, m: int = SEASON_LENGTH):
+    """
+    Additive Holt-Winters (level, trend, season of length m) for many series
+    at once, picking the (alpha, beta, gamma) with the lowest one-step SSE per
+    series. Needs at least two seasons of history.
+
+    Returns (level, trend, season, sse, params) where season is
+    (series, m) holding the last m seasonal terms in time order.
+    """
+    n_series, n_days = y.shape
+    alpha = grid[:, 0, None]
+    beta = grid[:, 1, None]
+    gamma = grid[:, 2, None]
+    g = len(grid)
+
+    # Initialise from the first two seasons
+    first = y[:, :m].mean(axis=1)
+    second = y[:, m:2 * m].mean(axis=1)
+    level = np.repeat(first[None, :], g, axis=0)
+    trend = np.repeat(((second - first) / m)[None, :], g, axis=0)
+    # (m, grid, series): each seasonal slot is one contiguous block
+    season = np.repeat((y[:, :m] - first[:, None]).T[:, None, :], g, axis=1)
+    sse = np.zeros((g, n_series))
+
+    for t in range(m, n_days):
+        s_prev = season[t % m]
+        error = y[None, :, t] - (level + trend + s_prev)
+        sse += error * error
+        new_level = alpha * (y[None, :, t] - s_prev) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[t % m] = gamma * (y[None, :, t] - new_level) + (1 - gamma) * s_prev
+        level = new_level
+
+    best = np.argmin(sse, axis=0)
+    columns = np.arange(n_series)
+    # Rotate the seasonal slots so index 0 is the day after the last observation
+    order = (np.arange(m) + n_days) % m
+    return (
+        level[best, columns],
+        trend[best, columns],
+        season[:, best, columns].T[:, order],
+        sse[best, columns],
+        grid[best]
+    )
+
+
+def _aic(sse: np.ndarray, n: int, k: int) -> np.ndarray:
+    return n * np.log(np.maximum(sse, 1e-9) / n) + 2 * k
+
+
+def forecast_chunk(y: np.ndarray, horizon: int):
+    """
+    Fit both models to a block of series and forecast each with whichever
+    has the lower AIC. Returns (forecasts (series, horizon), is_holt_winters).
+    Runs in a worker process, so it only takes and returns arrays.
+    """
+    n_days = y.shape[1]
+    level, ses_sse, _ = fit_ses(y)
+    forecasts = np.repeat(level[:, None], horizon, axis=1)
+    use_hw = np.zeros(y.shape[0], dtype=bool)
+
+    if n_days >= 2 * SEASON_LENGTH:
+        hw_level, hw_trend, hw_season, hw_sse, _ = fit_holt_winters(y)
+        use_hw = _aic(hw_sse, n_days - SEASON_LENGTH, 3 + SEASON_LENGTH) < _aic(ses_sse, n_days - 1, 1)
+        steps = np.arange(1, horizon + 1)
+        hw_forecasts = (
+            hw_level[:, None]
+            + hw_trend[:, None] * steps[None, :]
+            + hw_season[:, (steps - 1) % SEASON_LENGTH]
+        )
+        forecasts[use_hw] = hw_forecasts[use_hw]
+
+    # Demand cannot be negative
+    return np.maximum(forecasts, 0.0), use_hw
+
+
+def start_forecast_pool(workers: int = FORECAST_WORKERS):
+    """
+    Worker processes for the fits, or None to fit in the calling process.
+    Started with spawn: forking a server process copies its threads' locks
+    and open database connections into the children.
+    """
+    if workers <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _chunks(y: np.ndarray, chunk_size: int):
+    return [y[start:start + chunk_size] for start in range(0, y.shape[0], chunk_size)]
+
+
+def _combine(results, horizon: int):
+    if not results:
+        return np.empty((0, horizon)), np.zeros(0, dtype=bool)
+    forecasts, use_hw = zip(*results)
+    return np.concatenate(forecasts), np.concatenate(use_hw)
+
+
+def forecast_series(y: np.ndarray, horizon: int, pool: ProcessPoolExecutor = None, chunk_size: int = FORECAST_CHUNK_SIZE):
+    """Forecast every row of y, splitting the rows across the pool's worker processes"""
+    chunks = _chunks(y, chunk_size)
+    if pool is None or len(chunks) <= 1:
+        results = [forecast_chunk(chunk, horizon) for chunk in chunks]
+    else:
+        results = list(pool.map(forecast_chunk, chunks, [horizon] * len(chunks)))
+    return _combine(results, horizon)
+
+
+async def forecast_series_async(y: np.ndarray, horizon: int, pool: ProcessPoolExecutor = None, chunk_size: int = FORECAST_CHUNK_SIZE):
+    """forecast_series without blocking the event loop"""
+    if pool is None:
+        return await asyncio.to_thread(forecast_series, y, horizon, None, chunk_size)
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(pool, forecast_chunk, chunk, horizon) for chunk in _chunks(y, chunk_size)
+    ])
+    return _combine(results, horizon)
+
+
+def daily_sell_quantities(db: Session, since: datetime, days: int):
+    """
+    Approved sell-order quantities as a dense (product, day) matrix, one row
+    per product that sold anything since the given day
+    """
+    orders = Order.__table__
+    items = OrderItem.__table__
+    day = func.date(orders.c.updated_at)
+    rows = db.connection().execute(
+        select(items.c.product_id, day, func.sum(items.c.quantity))
+        .select_from(items.join(orders, orders.c.id == items.c.order_id))
+        .where(orders.c.order_type == "sell", orders.c.status == "completed", orders.c.updated_at >= since)
+        .group_by(items.c.product_id, day)
+    ).all()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, days))
+
+    product_ids, sale_days, quantities = zip(*rows)
+    product_ids, row = np.unique(np.array(product_ids, dtype=np.int64), return_inverse=True)
+    column = (to_datetime64(sale_days).astype("datetime64[D]") - np.datetime64(since.date(), "D")).astype(np.int64)
+    keep = (column >= 0) & (column < days)
+
+    y = np.zeros((len(product_ids), days))
+    np.add.at(y, (row[keep], column[keep]), np.array(quantities, dtype=np.float64)[keep])
+    return product_ids, y
+
+
+def history_start(started: datetime, history_days: int) -> datetime:
+    """Start of the first day of history fitted for a run started at the given time"""
+    return datetime.combine(started.date() - timedelta(days=history_days), datetime.min.time())
+
+
+def store_forecasts(db: Session, product_ids: np.ndarray, forecasts: np.ndarray, use_hw: np.ndarray, started: datetime):
+    """Replace the stored forecasts with these, starting on the day of the run"""
+    table = ProductForecast.__table__
+    db.execute(delete(table))
+    if len(product_ids):
+        days = [started.date() + timedelta(days=step) for step in range(forecasts.shape[1])]
+        methods = np.where(use_hw, "holt_winters", "ses").tolist()
+        rows = [
+            {"product_id": product_id, "day": day, "qty": qty, "method": method, "generated_at": started}
+            for product_id, method, values in zip(product_ids.tolist(), methods, forecasts.tolist())
+            for day, qty in zip(days, values)
+        ]
+        for offset in range(0, len(rows), 50000):
+            db.execute(insert(table), rows[offset:offset + 50000])
+
+    logger.info(
+        f"Forecast {len(product_ids)} products ({int(use_hw.sum())} Holt-Winters) "
+        f"in {(datetime.utcnow() - started).total_seconds():.2f}s"
+    )
+
+
+def compute_forecasts(
+    db: Session,
+    history_days: int = FORECAST_HISTORY_DAYS,
+    horizon: int = FORECAST_HORIZON_DAYS,
+    pool: ProcessPoolExecutor = None
+) -> int:
+    """
+    Refit every product's forecast and replace the stored forecasts.
+    Returns the number of products forecast.
+    """
+    started = datetime.utcnow()
+    product_ids, y = daily_sell_quantities(db, history_start(started, history_days), history_days)
+    forecasts, use_hw = forecast_series(y, horizon, pool)
+    store_forecasts(db, product_ids, forecasts, use_hw, started)
+    return len(product_ids)
+
+
+if __name__ == "__main__":
+    # For cron: python -m app.forecasting
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    pool = start_forecast_pool()
+    session = SessionLocal()
+    try:
+        compute_forecasts(session, pool=pool)
+        session.commit()
+    finally:
+        session.close()
+        if pool:
+            pool.shutdown()
@@ -3,7 +3,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 import logging
 import os
+import asyncio
 from .database import Base, engine
+from .snapshots import run_snapshot_schedule
+from .forecasting import start_forecast_pool
+from .ratelimit import RateLimitMiddleware
+from .replicas import ReadYourWritesMiddleware
 from .routers.products import router as products_router
 from .routers.orders import router as orders_router
 from .auth import router as auth_router
@@ -13,6 +18,11 @@ from .routers.users import router as users_router
 from .routers.customers import router as customers_router
 from .routers.stock_transfers import router as stock_transfers_router
 from .routers.stock_history import router as stock_history_router
+from .routers.events import router as events_router
+from .routers.stock_balances import router as stock_balances_router
+from .routers.replenishment import router as replenishment_router
+from .routers.dashboard import router as dashboard_router
+from .routers.metrics import router as metrics_router
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -40,13 +50,20 @@ origins = [
     "*127.0.0.1*"
 ]
 
+# Reads go to the primary for a while after a client's writes (see app/replicas.py)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Per-client token buckets on the busiest routes (see app/ratelimit.py). Added
+# before CORS so 429 responses still carry the CORS headers.
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["Content-Type", "Content-Length", "Authorization"],
+    expose_headers=["Content-Type", "Content-Length", "Authorization", "X-Next-Cursor"],
     max_age=86400  # Cache preflight requests for 24 hours
 )
 
@@ -70,6 +87,25 @@ async def log_requests(request, call_next):
 def on_startup():
     Base.metadata.create_all(bind=engine)
 
+# Periodic stock snapshots for point-in-time stock queries
+@app.on_event("startup")
+async def start_snapshot_schedule():
+    app.state.snapshot_task = asyncio.create_task(run_snapshot_schedule())
+
+@app.on_event("shutdown")
+async def stop_snapshot_schedule():
+    app.state.snapshot_task.cancel()
+
+# Worker processes for demand forecast fits, started once
+@app.on_event("startup")
+def start_forecast_workers():
+    app.state.forecast_pool = start_forecast_pool()
+
+@app.on_event("shutdown")
+def stop_forecast_workers():
+    if app.state.forecast_pool:
+        app.state.forecast_pool.shutdown()
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(products_router)
@@ -80,6 +116,11 @@ app.include_router(users_router)
 app.include_router(customers_router)
 app.include_router(stock_transfers_router)
 app.include_router(stock_history_router)
+app.include_router(events_router)
+app.include_router(stock_balances_router)
+app.include_router(replenishment_router)
+app.include_router(dashboard_router)
+app.include_router(metrics_router)
 
 # Root route for health check
 @app.get("/")
@@ -2,6 +2,11 @@ from ..database import Base
 from .product import Product
 from .order import Order, order_products
 from .user import User
-from .stock_transfer import StockTransfer  # Add this import
+from .stock_transfer import StockTransfer, StockTransferTransition  # Add this import
+from .stock_balance import StockBalance
+from .stock_movement import StockMovementDaily
+from .stock_snapshot import StockSnapshot
+from .replenishment import ProductReplenishment
+from .forecast import ProductForecast
 
-__all__ = ['Base', 'Product', 'Order', 'order_products', 'User', 'StockTransfer']
+__all__ = ['Base', 'Product', 'Order', 'order_products', 'User', 'StockTransfer', 'StockTransferTransition', 'StockBalance', 'StockMovementDaily', 'StockSnapshot', 'ProductReplenishment', 'ProductForecast']
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+class ProductForecast(Base):
+    """Forecast daily sell quantity of a product, written by the forecasting job"""
+    __tablename__ = "product_forecasts"
+    __table_args__ = (
+        Index("ux_product_forecasts_product_day", "product_id", "day", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    qty = Column(Float, nullable=False, default=0.0)
+    method = Column(String(20), nullable=False)  # ses or holt_winters
+    generated_at = Column(DateTime, default=datetime.utcnow)
@@ -41,6 +41,8 @@ class Locator(Base):
     length = Column(Float)
     width = Column(Float)
     height = Column(Float)
+    # Sum of qty x unit volume of the stock held here, kept current by app.stock
+    occupied_volume = Column(Float, nullable=False, default=0.0)
     sub_inventory_id = Column(Integer, ForeignKey("sub_inventories.id"))
     
     # Relationships
@@ -52,3 +54,4 @@ class Locator(Base):
     incoming_transfers = relationship("StockTransfer", 
                                     foreign_keys="StockTransfer.destination_location", 
                                     back_populates="destination")
+    balances = relationship("StockBalance", back_populates="locator", cascade="all, delete-orphan")
@@ -1,20 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # "A-class items low on stock" is a range scan on this index
+        Index("ix_products_abc_class_stock", "abc_class", "stock"),
+        Index("ix_products_xyz_class", "xyz_class"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255))
     description = Column(String(500))
     price = Column(Float)
     stock = Column(Integer)
+    # Unit dimensions, in the same unit as locator dimensions
+    length = Column(Float, nullable=True)
+    width = Column(Float, nullable=True)
+    height = Column(Float, nullable=True)
     category_id = Column(Integer, ForeignKey('categories.id'))
+    abc_class = Column(String(1), nullable=True)  # A/B/C by revenue share, set by app.classification
+    xyz_class = Column(String(1), nullable=True)  # X/Y/Z by demand variability
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Define relationships
     category = relationship("Category", back_populates="products")
     transfers = relationship("StockTransfer", back_populates="product", cascade="all, delete-orphan")
+    balances = relationship("StockBalance", back_populates="product", cascade="all, delete-orphan")
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+class ProductReplenishment(Base):
+    """Demand statistics and reorder thresholds computed by the replenishment job"""
+    __tablename__ = "product_replenishment"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    avg_daily_demand = Column(Float, nullable=False, default=0.0)
+    demand_variance = Column(Float, nullable=False, default=0.0)
+    lead_time_days = Column(Float, nullable=False)
+    safety_stock = Column(Float, nullable=False, default=0.0)
+    reorder_point = Column(Float, nullable=False, default=0.0)
+    window_days = Column(Integer, nullable=False)
+    service_level = Column(Float, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    product = relationship("Product")
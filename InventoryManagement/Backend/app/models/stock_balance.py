@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from ..database import Base
+
+class StockBalance(Base):
+    __tablename__ = "stock_balances"
+    __table_args__ = (
+        # One row per product per locator; also the target of the upsert-increment
+        Index("ux_stock_balances_product_locator", "product_id", "locator_id", unique=True),
+        # "Stock by locator" lookups
+        Index("ix_stock_balances_locator_product", "locator_id", "product_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    locator_id = Column(Integer, ForeignKey("locators.id", ondelete="CASCADE"), nullable=False)
+    qty = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    product = relationship("Product", back_populates="balances")
+    locator = relationship("Locator", back_populates="balances")
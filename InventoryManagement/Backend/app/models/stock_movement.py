@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Index
+from ..database import Base
+
+# locator_id used for movements that cannot be attributed to a locator. A real
+# value rather than NULL so the unique key below still deduplicates them.
+UNASSIGNED_LOCATOR = 0
+
+class StockMovementDaily(Base):
+    """
+    Stock moved in and out per product per locator per day. qty_adjusted holds
+    the net of changes that are not movements (initial stock, manual
+    corrections): history ignores it, stock reconstruction needs it.
+    """
+    __tablename__ = "stock_movement_daily"
+    __table_args__ = (
+        # One row per day, product and locator; also the target of the upsert-increment
+        Index("ux_stock_movement_daily_day_product_locator", "day", "product_id", "locator_id", unique=True),
+        # Per-product history
+        Index("ix_stock_movement_daily_product_day", "product_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    locator_id = Column(Integer, nullable=False, default=UNASSIGNED_LOCATOR)
+    qty_in = Column(Integer, nullable=False, default=0)
+    qty_out = Column(Integer, nullable=False, default=0)
+    qty_adjusted = Column(Integer, nullable=False, default=0)
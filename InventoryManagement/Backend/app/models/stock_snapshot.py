@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Date, DateTime, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+class StockSnapshot(Base):
+    """A product's total stock at the start (00:00 UTC) of a day"""
+    __tablename__ = "stock_snapshots"
+    __table_args__ = (
+        Index("ux_stock_snapshots_day_product", "day", "product_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    qty = Column(Integer, nullable=False, default=0)
+    taken_at = Column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,16 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, DateTime, ForeignKey, Index, event, inspect
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
 class StockTransfer(Base):
     __tablename__ = "stock_transfers"
+    __table_args__ = (
+        # Supports keyset pagination of the transfer list, newest first
+        Index("ix_stock_transfers_created_at_id", "created_at", "id"),
+        # Completed transfers in a date range (stock history)
+        Index("ix_stock_transfers_status_created_at", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
@@ -13,7 +19,7 @@ class StockTransfer(Base):
     source_category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
     destination_category_id = Column(Integer, ForeignKey("categories.id", ondelete="SET NULL"), nullable=True)
     quantity = Column(Integer, nullable=False)
-    status = Column(String(20), default="pending")  # pending, processing, completed, cancelled
+    status = Column(String(20), default="pending")  # pending, processing, completed, cancelled, merged
     notes = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -28,6 +34,11 @@ class StockTransfer(Base):
     destination_locator_name = Column(String(255), nullable=True)
     destination_category_name = Column(String(255), nullable=True)
 
+    # Consolidation audit trail: a merged transfer points at the one that absorbed
+    # it, and the absorbing transfer lists the ids it absorbed (comma-separated)
+    merged_into_id = Column(Integer, ForeignKey("stock_transfers.id", ondelete="SET NULL"), nullable=True)
+    merged_transfer_ids = Column(Text, nullable=True)
+
     # Improved relationships with consistent back_populates pattern
     product = relationship("Product", back_populates="transfers")
     creator = relationship("User", back_populates="transfers_created")
@@ -35,3 +46,49 @@ class StockTransfer(Base):
     destination = relationship("Locator", foreign_keys=[destination_location], back_populates="incoming_transfers")
     source_category = relationship("Category", foreign_keys=[source_category_id], back_populates="outgoing_transfers")
     destination_category = relationship("Category", foreign_keys=[destination_category_id], back_populates="incoming_transfers")
+
+
+# Compact status codes for the transition log
+TRANSFER_STATUS_CODES = {
+    "pending": 1,
+    "processing": 2,
+    "completed": 3,
+    "cancelled": 4,
+    "merged": 5,
+}
+TRANSFER_STATUS_NAMES = {code: name for name, code in TRANSFER_STATUS_CODES.items()}
+
+class StockTransferTransition(Base):
+    __tablename__ = "stock_transfer_transitions"
+    __table_args__ = (
+        Index("ix_stock_transfer_transitions_transfer_at", "transfer_id", "at"),
+        Index("ix_stock_transfer_transitions_to_status_at", "to_status", "at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    transfer_id = Column(Integer, ForeignKey("stock_transfers.id", ondelete="CASCADE"), nullable=False)
+    from_status = Column(SmallInteger, nullable=True)  # NULL when the transfer is created
+    to_status = Column(SmallInteger, nullable=False)
+    at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+def _record_transition(connection, transfer_id, from_status, to_status):
+    connection.execute(
+        StockTransferTransition.__table__.insert().values(
+            transfer_id=transfer_id,
+            from_status=TRANSFER_STATUS_CODES.get(from_status),
+            to_status=TRANSFER_STATUS_CODES.get(to_status, 0),
+            at=datetime.utcnow()
+        )
+    )
+
+# Every status change is timestamped in the same transaction as the change itself
+@event.listens_for(StockTransfer, "after_insert")
+def _log_created(mapper, connection, target):
+    _record_transition(connection, target.id, None, target.status)
+
+@event.listens_for(StockTransfer, "after_update")
+def _log_status_change(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if history.has_changes():
+        previous = history.deleted[0] if history.deleted else None
+        _record_transition(connection, target.id, previous, target.status)
@@ -7,9 +7,11 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True)
-    username = Column(String(255))
+    username = Column(String(255), index=True)
     hashed_password = Column(String(255))
     privileges = Column(Integer)
+    # Bumped on password and privilege changes; tokens carrying an older version are revoked
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     orders = relationship("Order", back_populates="user")
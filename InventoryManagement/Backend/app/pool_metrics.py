@@ -0,0 +1,160 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, List
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Checkout wait histogram bucket upper bounds, in milliseconds
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+# A checkout waiting this long, or finding every connection in use, is logged as saturation
+POOL_SLOW_CHECKOUT_MS = float(os.getenv("POOL_SLOW_CHECKOUT_MS", "100"))
+# At most one saturation warning per pool per interval
+POOL_ALERT_INTERVAL_SECONDS = float(os.getenv("POOL_ALERT_INTERVAL_SECONDS", "60"))
+
+
+class PoolMetrics:
+    """Checkout latency histogram and usage counters of one connection pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._buckets = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._overflow_checkouts = 0
+        self._max_checked_out = 0
+        self._max_overflow_used = 0
+        self._timeouts = 0
+        self._connects = 0
+        self._alerts = 0
+        self._next_alert = 0.0
+
+    def record_checkout(self, pool: QueuePool, seconds: float):
+        checked_out = pool.checkedout()
+        overflow = max(0, pool.overflow())
+        wait_ms = seconds * 1000
+        with self._lock:
+            self._buckets[bisect.bisect_left(CHECKOUT_BUCKETS_MS, wait_ms)] += 1
+            self._checkouts += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+            self._max_checked_out = max(self._max_checked_out, checked_out)
+            self._max_overflow_used = max(self._max_overflow_used, overflow)
+            if overflow:
+                self._overflow_checkouts += 1
+        if wait_ms >= POOL_SLOW_CHECKOUT_MS or checked_out >= pool.size() + pool._max_overflow:
+            self._alert(f"{checked_out} of {pool.size()} + {pool._max_overflow} connections checked out, checkout waited {wait_ms:.0f} ms")
+
+    def record_timeout(self, pool: QueuePool):
+        with self._lock:
+            self._timeouts += 1
+        self._alert(f"checkout timed out after {pool.timeout():.0f}s with {pool.checkedout()} connections checked out")
+
+    def record_connect(self):
+        with self._lock:
+            self._connects += 1
+
+    def _alert(self, message: str):
+        now = time.monotonic()
+        with self._lock:
+            self._alerts += 1
+            if now < self._next_alert:
+                return
+            self._next_alert = now + POOL_ALERT_INTERVAL_SECONDS
+        logger.warning(f"Connection pool {self.name} saturated: {message}")
+
+    def _percentile_ms(self, fraction: float) -> float:
+        # Upper bound of the bucket holding the percentile, capped at the largest wait seen
+        target = fraction * self._checkouts
+        seen = 0
+        for bound, count in zip(CHECKOUT_BUCKETS_MS + (float("inf"),), self._buckets):
+            seen += count
+            if seen >= target and count:
+                return min(bound, self._wait_max * 1000)
+        return 0.0
+
+    def snapshot(self, pool: QueuePool) -> Dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow_in_use": max(0, pool.overflow()),
+                "max_checked_out": self._max_checked_out,
+                "max_overflow_used": self._max_overflow_used,
+                "checkouts": self._checkouts,
+                "overflow_checkouts": self._overflow_checkouts,
+                "timeouts": self._timeouts,
+                "connects": self._connects,
+                "saturation_alerts": self._alerts,
+                "avg_wait_ms": self._wait_total / self._checkouts * 1000 if self._checkouts else 0.0,
+                "max_wait_ms": self._wait_max * 1000,
+                "p50_wait_ms": self._percentile_ms(0.5),
+                "p95_wait_ms": self._percentile_ms(0.95),
+                "p99_wait_ms": self._percentile_ms(0.99),
+                "wait_histogram": [
+                    {"le_ms": bound, "count": count}
+                    for bound, count in zip(CHECKOUT_BUCKETS_MS + (None,), self._buckets)
+                ],
+            }
+
+
+class InstrumentedPoolMixin:
+    """
+    Times checkouts, including the wait for a free connection, which no pool
+    event brackets. Metrics carry over when the engine recreates its pool.
+    """
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics:
+                self.metrics.record_timeout(self)
+            raise
+        if self.metrics:
+            self.metrics.record_checkout(self, time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+# Log under SQLAlchemy's pool loggers (WARN by default) rather than this module's
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.QueuePool"
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+
+# Instrumented engines by name, in registration order
+_engines = {}
+
+
+def instrument_pool(name: str, engine):
+    """Start collecting metrics for engine's pool (for an async engine, pass engine.sync_engine)"""
+    if not isinstance(engine.pool, InstrumentedPoolMixin):
+        return
+    metrics = engine.pool.metrics = PoolMetrics(name)
+    event.listen(engine, "connect", lambda dbapi_connection, connection_record: metrics.record_connect())
+    _engines[name] = engine
+
+
+def pool_metrics() -> List[Dict]:
+    return [engine.pool.metrics.snapshot(engine.pool) for engine in _engines.values()]
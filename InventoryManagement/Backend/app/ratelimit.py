@@ -0,0 +1,197 @@
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Per-route limits as "path_prefix:rate_per_second:burst", comma separated.
+# The first matching prefix applies; requests matching none are not limited.
+DEFAULT_RATE_LIMIT_RULES = (
+    "/auth/login:0.5:10,"
+    "/products:10:40,"
+    "/stock-transfers:10:40,"
+    "/stock-history:5:20,"
+    "/dashboard:5:20"
+)
+RATE_LIMIT_RULES = os.getenv("RATE_LIMIT_RULES", DEFAULT_RATE_LIMIT_RULES)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Only behind a proxy that sets it; otherwise clients could pick their own key
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+# How often idle buckets are swept out
+RATE_LIMIT_SWEEP_SECONDS = 60.0
+# At most one "rate limit exceeded" warning per client per interval
+RATE_LIMIT_WARNING_INTERVAL_SECONDS = float(os.getenv("RATE_LIMIT_WARNING_INTERVAL_SECONDS", "60"))
+
+
+class RateLimitRule:
+    __slots__ = ("prefix", "rate", "burst")
+
+    def __init__(self, prefix: str, rate: float, burst: float):
+        self.prefix = prefix
+        self.rate = rate
+        self.burst = burst
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix.rstrip("/") + "/")
+
+
+def parse_rules(spec: str) -> List[RateLimitRule]:
+    rules = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        prefix, rate, burst = entry.rsplit(":", 2)
+        rules.append(RateLimitRule(prefix, float(rate), float(burst)))
+    return rules
+
+
+class Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by (rule, client). A bucket refills at rule.rate
+    tokens per second up to rule.burst and each request takes one.
+
+    A bucket left alone for burst / rate seconds is full again, which is the
+    same as not existing, so the periodic sweep drops it; memory is bounded
+    by the clients active within that window.
+    """
+
+    def __init__(self, rules: List[RateLimitRule]):
+        self.rules = rules
+        self._buckets: Dict[Tuple[int, str], Bucket] = {}
+        self._next_sweep = time.monotonic() + RATE_LIMIT_SWEEP_SECONDS
+
+    def rule_for(self, path: str) -> Optional[Tuple[int, RateLimitRule]]:
+        for index, rule in enumerate(self.rules):
+            if rule.matches(path):
+                return index, rule
+        return None
+
+    def acquire(self, rule_index: int, rule: RateLimitRule, client: str, now: float = None) -> float:
+        """Take a token; returns 0 if allowed, otherwise seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        key = (rule_index, client)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = Bucket(rule.burst, now)
+        else:
+            bucket.tokens = min(rule.burst, bucket.tokens + (now - bucket.updated_at) * rule.rate)
+            bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / rule.rate
+
+    def sweep(self, now: float = None):
+        now = time.monotonic() if now is None else now
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if (now - bucket.updated_at) * self.rules[key[0]].rate + bucket.tokens < self.rules[key[0]].burst
+        }
+        self._next_sweep = now + RATE_LIMIT_SWEEP_SECONDS
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LimitWarnings:
+    """
+    Throttled "rate limit exceeded" warnings: the first rejection of a client
+    in an interval is logged with the count of those suppressed since, so a
+    client hammering an endpoint cannot flood the log.
+    """
+
+    def __init__(self, interval: float = RATE_LIMIT_WARNING_INTERVAL_SECONDS):
+        self.interval = interval
+        self._next_warning: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._next_sweep = time.monotonic() + RATE_LIMIT_SWEEP_SECONDS
+
+    def rejected(self, client: str, prefix: str, now: float = None):
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            # A client whose interval has passed warns again anyway
+            self._next_warning = {key: until for key, until in self._next_warning.items() if until > now}
+            self._suppressed = {key: count for key, count in self._suppressed.items() if key in self._next_warning}
+            self._next_sweep = now + RATE_LIMIT_SWEEP_SECONDS
+        if now < self._next_warning.get(client, 0):
+            self._suppressed[client] = self._suppressed.get(client, 0) + 1
+            return
+        self._next_warning[client] = now + self.interval
+        suppressed = self._suppressed.pop(client, 0)
+        more = f" ({suppressed} more rejections since the last warning)" if suppressed else ""
+        logger.warning(f"Rate limit exceeded for {client} on {prefix}{more}")
+
+    def __len__(self):
+        return len(self._next_warning)
+
+
+def client_key(scope) -> str:
+    """The token subject for authenticated requests, otherwise the client IP"""
+    headers = Headers(scope=scope)
+    authorization = headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            # Verified, so a client cannot spread its requests over made-up subjects
+            payload = jwt.decode(
+                authorization[7:],
+                os.getenv("JWT_SECRET_KEY"),
+                algorithms=[os.getenv("JWT_ALGORITHM", "HS256")]
+            )
+            if payload.get("sub"):
+                return f"user:{payload['sub']}"
+        except JWTError:
+            pass
+
+    if RATE_LIMIT_TRUST_FORWARDED and "x-forwarded-for" in headers:
+        return "ip:" + headers["x-forwarded-for"].split(",")[0].strip()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After once a client's bucket is empty"""
+
+    def __init__(self, app, rules: str = RATE_LIMIT_RULES, enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.enabled = enabled
+        self.limiter = TokenBucketLimiter(parse_rules(rules))
+        self.warnings = LimitWarnings()
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        match = self.limiter.rule_for(scope["path"])
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        rule_index, rule = match
+        client = client_key(scope)
+        wait = self.limiter.acquire(rule_index, rule, client)
+        if wait:
+            self.warnings.rejected(client, rule.prefix)
+            response = JSONResponse(
+                {"detail": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,148 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from statistics import NormalDist
+import numpy as np
+from sqlalchemy import delete, insert, select, func
+from sqlalchemy.orm import Session
+from .analytics import datetime_text, to_datetime64, seconds_between, product_index
+from .database import SessionLocal
+from .models.order import Order, OrderItem
+from .models.product import Product
+from .models.replenishment import ProductReplenishment
+from .models.stock_movement import StockMovementDaily
+
+logger = logging.getLogger(__name__)
+
+# Days of demand history the statistics are computed over
+REPLENISHMENT_WINDOW_DAYS = int(os.getenv("REPLENISHMENT_WINDOW_DAYS", "90"))
+# Probability of not running out during a lead time
+REPLENISHMENT_SERVICE_LEVEL = float(os.getenv("REPLENISHMENT_SERVICE_LEVEL", "0.95"))
+# Used for products without completed purchase orders in the window
+REPLENISHMENT_DEFAULT_LEAD_TIME_DAYS = float(os.getenv("REPLENISHMENT_DEFAULT_LEAD_TIME_DAYS", "7"))
+
+SECONDS_PER_DAY = 86400.0
+
+
+def demand_statistics(product_ids: np.ndarray, demand_products: np.ndarray, demand_qty: np.ndarray, window_days: int):
+    """
+    Mean and sample variance of daily demand per product.
+
+    demand_* are sparse (product, day) totals; days without a row count as
+    zero demand, so sums over the rows divided by the window length give the
+    statistics over every day in the window.
+    """
+    index, found = product_index(product_ids, demand_products)
+    demand_qty = demand_qty[found]
+    n = len(product_ids)
+    total = np.bincount(index, weights=demand_qty, minlength=n)
+    total_sq = np.bincount(index, weights=demand_qty * demand_qty, minlength=n)
+
+    mean = total / window_days
+    variance = (total_sq - window_days * mean * mean) / max(window_days - 1, 1)
+    return mean, np.maximum(variance, 0.0)
+
+
+def average_lead_times(product_ids: np.ndarray, order_products: np.ndarray, lead_days: np.ndarray, default: float):
+    """Mean lead time per product, default where a product has no observations"""
+    index, found = product_index(product_ids, order_products)
+    lead_days = lead_days[found]
+    n = len(product_ids)
+    count = np.bincount(index, minlength=n)
+    total = np.bincount(index, weights=lead_days, minlength=n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), default)
+
+
+def reorder_thresholds(mean: np.ndarray, variance: np.ndarray, lead_time: np.ndarray, service_level: float):
+    """
+    Safety stock z * sigma_d * sqrt(L) and reorder point mean_d * L + safety
+    stock, for demand with normally distributed daily variation
+    """
+    z = NormalDist().inv_cdf(service_level)
+    safety_stock = z * np.sqrt(variance) * np.sqrt(lead_time)
+    return safety_stock, mean * lead_time + safety_stock
+
+
+def compute_replenishment(
+    db: Session,
+    window_days: int = REPLENISHMENT_WINDOW_DAYS,
+    service_level: float = REPLENISHMENT_SERVICE_LEVEL
+) -> int:
+    """
+    Recompute product_replenishment for the whole catalog in one pass.
+
+    Demand is the stock leaving each product per day (approved sell orders
+    and completed transfers out) from the daily movement rollup; lead time
+    is the mean time from creation to approval of its purchase orders.
+    Returns the number of products written.
+    """
+    started = datetime.utcnow()
+    since = started.date() - timedelta(days=window_days)
+    dialect = db.get_bind().dialect.name
+    connection = db.connection()
+
+    product_ids = np.array(connection.execute(select(Product.id).order_by(Product.id)).scalars().all(), dtype=np.int64)
+
+    movements = StockMovementDaily.__table__
+    daily = func.sum(movements.c.qty_out)
+    rows = connection.execute(
+        select(movements.c.product_id, daily)
+        .where(movements.c.day > since)
+        .group_by(movements.c.product_id, movements.c.day)
+        .having(daily > 0)
+    ).all()
+    demand_products, demand_qty = zip(*rows) if rows else ((), ())
+    mean, variance = demand_statistics(
+        product_ids,
+        np.array(demand_products, dtype=np.int64),
+        np.array(demand_qty, dtype=np.float64),
+        window_days
+    )
+
+    orders = Order.__table__
+    items = OrderItem.__table__
+    rows = connection.execute(
+        select(items.c.product_id, datetime_text(orders.c.created_at, dialect), datetime_text(orders.c.updated_at, dialect))
+        .select_from(items.join(orders, orders.c.id == items.c.order_id))
+        .where(orders.c.order_type == "purchase", orders.c.status == "completed", orders.c.updated_at >= since)
+    ).all()
+    order_products, created_at, approved_at = zip(*rows) if rows else ((), (), ())
+    lead_days = seconds_between(to_datetime64(created_at), to_datetime64(approved_at)) / SECONDS_PER_DAY
+    lead_time = average_lead_times(
+        product_ids, np.array(order_products, dtype=np.int64), lead_days, REPLENISHMENT_DEFAULT_LEAD_TIME_DAYS
+    )
+
+    safety_stock, reorder_point = reorder_thresholds(mean, variance, lead_time, service_level)
+
+    table = ProductReplenishment.__table__
+    db.execute(delete(table))
+    if len(product_ids):
+        columns = (product_ids, mean, variance, lead_time, safety_stock, reorder_point)
+        db.execute(insert(table), [
+            {
+                "product_id": product_id,
+                "avg_daily_demand": avg,
+                "demand_variance": var,
+                "lead_time_days": lead,
+                "safety_stock": safety,
+                "reorder_point": reorder,
+                "window_days": window_days,
+                "service_level": service_level,
+                "computed_at": started,
+            }
+            for product_id, avg, var, lead, safety, reorder in zip(*(column.tolist() for column in columns))
+        ])
+    logger.info(f"Computed replenishment for {len(product_ids)} products in {(datetime.utcnow() - started).total_seconds():.2f}s")
+    return len(product_ids)
+
+
+if __name__ == "__main__":
+    # For cron: python -m app.replenishment
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = SessionLocal()
+    try:
+        compute_replenishment(session)
+        session.commit()
+    finally:
+        session.close()
@@ -0,0 +1,126 @@
+import itertools
+import logging
+import os
+import time
+from typing import Dict
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from .database import (
+    ReadSessionLocal, AsyncSessionLocal, SAFE_METHODS, engine_options, async_database_url, is_sqlite, set_sqlite_pragmas
+)
+from .ratelimit import client_key
+from .pool_metrics import instrument_pool
+
+logger = logging.getLogger(__name__)
+
+# Read replicas as database URLs, comma separated; reads use the primary when empty
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# After a client's write, its reads go to the primary for this long so replica
+# lag cannot hide its own changes
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# How often expired write windows are swept out
+RECENT_WRITES_SWEEP_SECONDS = 60.0
+
+
+def _replica_engines(urls):
+    engines = []
+    for index, url in enumerate(urls):
+        engine = create_engine(url, **engine_options(url))
+        if is_sqlite(url):
+            event.listen(engine, "connect", set_sqlite_pragmas)
+        instrument_pool(f"replica-{index}", engine)
+        engines.append(engine)
+    return engines
+
+
+def _async_replica_engines(urls):
+    engines = []
+    for index, url in enumerate(urls):
+        engine = create_async_engine(async_database_url(url), **engine_options(url, asynchronous=True))
+        if is_sqlite(url):
+            event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+        instrument_pool(f"replica-{index}-async", engine.sync_engine)
+        engines.append(engine)
+    return engines
+
+
+replica_engines = _replica_engines(DATABASE_REPLICA_URLS)
+async_replica_engines = _async_replica_engines(DATABASE_REPLICA_URLS)
+
+# Round-robin over the replicas; the primary's sessions when there are none
+_replica_sessions = itertools.cycle(
+    [sessionmaker(autocommit=False, autoflush=False, bind=engine) for engine in replica_engines] or [ReadSessionLocal]
+)
+_async_replica_sessions = itertools.cycle(
+    [async_sessionmaker(engine, autoflush=False, expire_on_commit=False) for engine in async_replica_engines]
+    or [AsyncSessionLocal]
+)
+
+
+class RecentWrites:
+    """
+    Clients that wrote within the last `window` seconds. Entries expire on
+    their own; the periodic sweep only frees their memory.
+    """
+
+    def __init__(self, window: float = READ_YOUR_WRITES_SECONDS):
+        self.window = window
+        self._until: Dict[str, float] = {}
+        self._next_sweep = time.monotonic() + RECENT_WRITES_SWEEP_SECONDS
+
+    def mark(self, client: str, now: float = None):
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._until = {key: until for key, until in self._until.items() if until > now}
+            self._next_sweep = now + RECENT_WRITES_SWEEP_SECONDS
+        self._until[client] = now + self.window
+
+    def recent(self, client: str, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return self._until.get(client, 0) > now
+
+    def __len__(self):
+        return len(self._until)
+
+
+recent_writes = RecentWrites()
+
+
+def reads_from_primary(request: Request) -> bool:
+    return not replica_engines or recent_writes.recent(client_key(request.scope))
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware opening a client's read-your-writes window after each non-GET request"""
+
+    def __init__(self, app, tracker: RecentWrites = recent_writes):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if not replica_engines or scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Marked once the request is done, so the window starts after its commit
+            self.tracker.mark(client_key(scope))
+
+
+# Function to get a DB session for read-only routes
+def get_read_db(request: Request):
+    db = ReadSessionLocal() if reads_from_primary(request) else next(_replica_sessions)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Function to get an async DB session for read-only routes
+async def get_async_read_db(request: Request):
+    factory = AsyncSessionLocal if reads_from_primary(request) else next(_async_replica_sessions)
+    async with factory() as db:
+        yield db
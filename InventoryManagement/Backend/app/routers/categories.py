@@ -8,6 +8,7 @@ from ..schemas.category import CategoryCreate, Category as CategorySchema
 from ..utils import get_current_user
 from ..models.product import Product
 from ..schemas.product import ProductCreate, Product as ProductSchema
+from ..stock import record_stock_change, change_stock, resize_product, product_volume, InsufficientStockError
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
@@ -101,6 +102,9 @@ async def add_product_to_category(
     
     try:
         db.add(db_product)
+        db.flush()
+        # Initial stock sits at the category's locator
+        record_stock_change(db, db_product, db_product.stock or 0)
         db.commit()
         db.refresh(db_product)
         return db_product
@@ -129,14 +133,29 @@ async def update_product_in_category(
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found in this category")
 
-    # Update product fields
-    for field, value in product.model_dump(exclude_unset=True).items():
+    # Update product fields; stock is applied separately as a delta
+    updates = product.model_dump(exclude_unset=True)
+    new_stock = updates.pop("stock", None)
+    old_volume = product_volume(db_product)
+    for field, value in updates.items():
         setattr(db_product, field, value)
     
     try:
+        # New dimensions change the space the product takes wherever it is stored;
+        # flush them so the stock change below is booked at the new volume too
+        resize_product(db, db_product.id, old_volume, product_volume(db_product))
+        db.flush()
+        if new_stock is not None:
+            # Book a manual stock correction: an increase at the category's locator,
+            # a decrease from the locators holding the stock. It is applied as a
+            # delta so a concurrent order approval isn't overwritten.
+            change_stock(db, db_product, new_stock - (db_product.stock or 0), movement=False)
         db.commit()
         db.refresh(db_product)
         return db_product
+    except InsufficientStockError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=f"Stock changed concurrently: {str(e)}")
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
@@ -162,6 +181,7 @@ async def delete_product_from_category(
         raise HTTPException(status_code=404, detail="Product not found in this category")
 
     try:
+        resize_product(db, db_product.id, product_volume(db_product), 0.0)
         db.delete(db_product)
         db.commit()
         return {"message": "Product deleted successfully"}
@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+from ..cache import SingleFlightCache
+from ..database import ReadSessionLocal
+from ..models.category import Category
+from ..models.order import Order, OrderItem
+from ..models.product import Product
+from ..models.stock_movement import StockMovementDaily
+from ..schemas.dashboard import DashboardSummary
+from ..utils import get_current_user
+from ..analytics import as_datetime
+from .stock_history import bucket_start
+from datetime import date, datetime, timedelta
+import asyncio
+import logging
+import os
+
+# Add logger for debugging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+# Products with stock above zero but below this count as low on stock
+LOW_STOCK_THRESHOLD = int(os.getenv("LOW_STOCK_THRESHOLD", "20"))
+# How long a computed summary is served before it is recomputed
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "15"))
+SUMMARY_MONTHS = 6
+RECENT_ORDERS = 5
+
+summary_cache = SingleFlightCache(DASHBOARD_CACHE_SECONDS)
+
+def compute_dashboard_summary(db: Session) -> dict:
+    """Dashboard KPIs from a handful of aggregate queries"""
+    connection = db.connection()
+    dialect = db.get_bind().dialect.name
+    now = datetime.utcnow()
+
+    products = Product.__table__
+    stock = func.coalesce(products.c.stock, 0)
+    totals = connection.execute(select(
+        func.count(),
+        func.sum(stock),
+        func.sum(stock * func.coalesce(products.c.price, 0)),
+        func.sum(case(((stock > 0) & (stock < LOW_STOCK_THRESHOLD), 1), else_=0)),
+        func.sum(case((stock == 0, 1), else_=0))
+    ).select_from(products)).one()
+
+    categories = Category.__table__
+    category_name = func.coalesce(categories.c.name, "Uncategorized")
+    category_rows = connection.execute(
+        select(category_name, func.count())
+        .select_from(products.outerjoin(categories, categories.c.id == products.c.category_id))
+        .group_by(category_name)
+        .order_by(category_name)
+    ).all()
+
+    movements = StockMovementDaily.__table__
+    month = bucket_start(movements.c.day, "month", dialect)
+    months_back = now.year * 12 + now.month - 1 - (SUMMARY_MONTHS - 1)
+    first_month = date(months_back // 12, months_back % 12 + 1, 1)
+    month_rows = connection.execute(
+        select(month, func.sum(movements.c.qty_in), func.sum(movements.c.qty_out))
+        .where(movements.c.day >= first_month)
+        .group_by(month)
+        .order_by(month)
+    ).all()
+    week_in, week_out = connection.execute(
+        select(func.sum(movements.c.qty_in), func.sum(movements.c.qty_out))
+        .where(movements.c.day > now.date() - timedelta(days=7))
+    ).one()
+
+    orders = Order.__table__
+    items = OrderItem.__table__
+    recent = select(orders).order_by(orders.c.created_at.desc(), orders.c.id.desc()).limit(RECENT_ORDERS).subquery()
+    order_rows = connection.execute(
+        select(recent.c.id, recent.c.order_type, recent.c.status, recent.c.total, recent.c.created_at, func.count(items.c.id))
+        .select_from(recent.outerjoin(items, items.c.order_id == recent.c.id))
+        .group_by(recent.c.id, recent.c.order_type, recent.c.status, recent.c.total, recent.c.created_at)
+        .order_by(recent.c.created_at.desc(), recent.c.id.desc())
+    ).all()
+
+    total_products, total_stock, stock_value, low_stock, out_of_stock = totals
+    return {
+        "total_products": total_products,
+        "total_stock": int(total_stock or 0),
+        "stock_value": float(stock_value or 0),
+        "low_stock": int(low_stock or 0),
+        "out_of_stock": int(out_of_stock or 0),
+        "low_stock_threshold": LOW_STOCK_THRESHOLD,
+        "moved_in_last_7_days": int(week_in or 0),
+        "moved_out_last_7_days": int(week_out or 0),
+        "categories": [{"name": name, "products": count} for name, count in category_rows],
+        "monthly_movements": [
+            {"month": as_datetime(when).date(), "qty_in": int(qty_in or 0), "qty_out": int(qty_out or 0)}
+            for when, qty_in, qty_out in month_rows
+        ],
+        "recent_orders": [
+            {"id": id_, "type": type_, "status": status, "total": total or 0, "items": count, "created_at": created_at}
+            for id_, type_, status, total, created_at, count in order_rows
+        ],
+        "generated_at": now
+    }
+
+def _load_summary() -> dict:
+    # Own session: the result is shared by every request waiting on this load
+    db = ReadSessionLocal()
+    try:
+        return compute_dashboard_summary(db)
+    finally:
+        db.close()
+
+@router.get("/summary", response_model=DashboardSummary)
+async def get_dashboard_summary(current_user = Depends(get_current_user)):
+    """
+    Inventory KPIs for the dashboard: totals, stock value, low-stock counts,
+    movement volume per month and the latest orders.
+
+    Cached for DASHBOARD_CACHE_SECONDS; concurrent requests after expiry wait
+    on a single recomputation.
+    """
+    try:
+        return await summary_cache.get("summary", lambda: asyncio.to_thread(_load_summary))
+    except Exception as e:
+        logger.exception(f"Error computing dashboard summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import logging
+from ..events import broker, format_sse
+from ..utils import get_current_user
+
+# Add logger for debugging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+# Send a comment line this often so proxies don't close idle streams
+HEARTBEAT_SECONDS = 15
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    access_token: Optional[str] = None,
+    last_event_id: Optional[int] = None,
+    authorization: Optional[str] = Header(None),
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events stream of stock transfer and order status changes.
+
+    Browsers' EventSource cannot set headers, so the token may also be passed
+    as the access_token query parameter.
+    """
+    token = access_token
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+
+    # get_current_user uses its own short-lived session on a cache miss, so
+    # none is held open for the lifetime of the stream
+    await get_current_user(token=token)
+
+    # The header wins because the browser sets it on automatic reconnects
+    if last_event_id_header:
+        try:
+            last_event_id = int(last_event_id_header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID header")
+
+    sub = broker.subscribe(last_event_id)
+    logger.debug(f"SSE client connected, resuming after {last_event_id}, {broker.subscriber_count} subscribers")
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            if sub.reset:
+                # Client missed events we no longer have; it must reload its state
+                yield "event: reset\ndata: {}\n\n"
+            for evt in sub.backlog:
+                yield format_sse(evt)
+
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    evt = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if evt is None:
+                    logger.warning("SSE client fell behind, closing stream so it can resume")
+                    break
+                yield format_sse(evt)
+        finally:
+            broker.unsubscribe(sub)
+            logger.debug(f"SSE client disconnected, {broker.subscriber_count} subscribers")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
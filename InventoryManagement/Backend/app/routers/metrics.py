@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from ..pool_metrics import pool_metrics
+from ..utils import get_current_user, password_pool
+import logging
+
+# Add logger for debugging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/pools")
+async def get_pool_metrics(current_user = Depends(get_current_user)):
+    """
+    Database connection pool usage since startup: checkout wait histogram and
+    percentiles, checked-out and overflow counts, and timeouts, per engine.
+    The password hashing pool is included for comparison.
+    """
+    return {"database": pool_metrics(), "password_hashing": password_pool.metrics()}
@@ -3,9 +3,11 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session, joinedload
 from typing import List
 from ..database import get_db
+from ..replicas import get_read_db
 from ..models.order import Order, OrderItem
 from ..models.product import Product
 from ..schemas.order import OrderCreate, OrderResponse
+from ..stock import change_stock, claim_status_change, InsufficientStockError
 from ..utils import get_current_user
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
@@ -184,7 +186,7 @@ def generate_order_report(order: Order, db: Session) -> str:
 
 @router.get("/", response_model=List[OrderResponse])
 async def get_orders(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user = Depends(get_current_user)
 ):
     try:
@@ -331,12 +333,15 @@ async def approve_order(
     # Validate order status - only pending or processing orders can be approved
     if order.status not in ["pending", "processing"]:
         raise HTTPException(
-            status_code=400, 
+            status_code=409, 
             detail=f"Cannot approve order with status '{order.status}'. Only pending or processing orders can be approved."
         )
     
     try:
-        # Update order status to completed
+        # Claim the order first so a concurrent approval cannot apply it twice
+        if not claim_status_change(db, Order, order.id, ["pending", "processing"], "completed"):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Order has already been processed")
         order.status = "completed"
         order.updated_at = datetime.utcnow()
         
@@ -347,16 +352,15 @@ async def approve_order(
             if not product:
                 raise HTTPException(status_code=404, detail=f"Product with ID {item.product_id} not found")
             
-            if order.order_type == "sell":
-                # Check if there's enough stock
-                if product.stock < item.quantity:
-                    raise HTTPException(
-                        status_code=400, 
-                        detail=f"Insufficient stock for {product.name}. Required: {item.quantity}, Available: {product.stock}"
-                    )
-                product.stock -= item.quantity
-            else:  # purchase order
-                product.stock += item.quantity
+            delta = -item.quantity if order.order_type == "sell" else item.quantity
+            try:
+                # Checked and applied by the database in one statement
+                change_stock(db, product, delta)
+            except InsufficientStockError as e:
+                raise HTTPException(
+                    status_code=400, 
+                    detail=f"Insufficient stock for {product.name}. Required: {e.requested}, Available: {e.available}"
+                )
         
         # Commit all changes
         db.commit()
@@ -367,6 +371,9 @@ async def approve_order(
             "status": order.status
         }
         
+    except HTTPException:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         logger.error(f"Error approving order {order_id}: {str(e)}")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Query
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
@@ -10,7 +10,8 @@ from ..models.organization import Organization, SubInventory, Locator
 from ..schemas.organization import (
     OrganizationCreate, Organization as OrgSchema,
     SubInventoryCreate, SubInventory as SubInvSchema,
-    LocatorCreate, Locator as LocatorSchema
+    LocatorCreate, Locator as LocatorSchema,
+    SubInventoryUtilization
 )
 from ..utils import get_current_user
 
@@ -119,6 +120,77 @@ async def get_organizations(
             print(f"File exists: {os.path.exists(org.attachment_path)}")
     return orgs
 
+def _ratio(occupied: float, capacity: Optional[float]) -> Optional[float]:
+    return occupied / capacity if capacity else None
+
+@router.get("/utilization", response_model=List[SubInventoryUtilization])
+async def get_utilization(
+    sub_inventory_id: Optional[int] = None,
+    min_utilization: Optional[float] = Query(None, ge=0),
+    max_utilization: Optional[float] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Space utilization (occupied volume / capacity) per locator and sub-inventory.
+
+    Occupied volume is maintained as stock moves, so this reads only the
+    locators. min_utilization=1 finds over-full bins, max_utilization=0 empty
+    ones; locators without dimensions have no utilization and are left out
+    when filtering.
+    """
+    query = db.query(SubInventory, Locator).outerjoin(Locator, Locator.sub_inventory_id == SubInventory.id)
+    if sub_inventory_id:
+        query = query.filter(SubInventory.id == sub_inventory_id)
+
+    result = {}
+    for sub_inv, locator in query.order_by(SubInventory.id, Locator.id):
+        entry = result.setdefault(sub_inv.id, {
+            "sub_inventory": sub_inv, "capacity": 0.0, "occupied": 0.0, "measured_occupied": 0.0, "locators": []
+        })
+        if locator is None:
+            continue
+        capacity = None
+        if locator.length and locator.width and locator.height:
+            capacity = locator.length * locator.width * locator.height
+        occupied = locator.occupied_volume or 0.0
+        entry["occupied"] += occupied
+        if capacity:
+            entry["capacity"] += capacity
+            entry["measured_occupied"] += occupied
+        entry["locators"].append({
+            "id": locator.id,
+            "code": locator.code,
+            "capacity": capacity,
+            "occupied_volume": occupied,
+            "utilization": _ratio(occupied, capacity)
+        })
+
+    filtering = min_utilization is not None or max_utilization is not None
+    response = []
+    for entry in result.values():
+        locators = entry["locators"]
+        if filtering:
+            locators = [
+                locator for locator in locators
+                if locator["utilization"] is not None
+                and (min_utilization is None or locator["utilization"] >= min_utilization)
+                and (max_utilization is None or locator["utilization"] <= max_utilization)
+            ]
+            if not locators:
+                continue
+        sub_inv = entry["sub_inventory"]
+        response.append({
+            "id": sub_inv.id,
+            "name": sub_inv.name,
+            "organization_id": sub_inv.organization_id,
+            "capacity": entry["capacity"] or None,
+            "occupied_volume": entry["occupied"],
+            "utilization": _ratio(entry["measured_occupied"], entry["capacity"]),
+            "locators": locators
+        })
+    return response
+
 @router.get("/{org_id}/attachment")
 async def get_organization_attachment(
     org_id: int,
@@ -1,13 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime, timedelta
 from ..database import get_db
+from ..replicas import get_async_read_db
 from ..models.product import Product
 from ..models.stock_transfer import StockTransfer
-from ..schemas.product import ProductCreate, Product as ProductSchema, ProductOut
+from ..models.forecast import ProductForecast
+from ..schemas.product import (
+    ProductCreate, Product as ProductSchema, ProductOut, StockAsOfResponse,
+    ProductForecastResponse, ForecastRunResult, ClassificationRunResult
+)
 from ..schemas.stock_transfer import StockHistoryResponse
+from ..stock import record_stock_change, stock_in_category
+from ..snapshots import stock_as_of
+from ..classification import classify_products, CLASSIFICATION_WINDOW_DAYS
+from ..forecasting import (
+    daily_sell_quantities, forecast_series_async, history_start, store_forecasts,
+    FORECAST_HISTORY_DAYS, FORECAST_HORIZON_DAYS
+)
 from ..utils import get_current_user
+from ..analytics import interleave_movements, columns_to_json, to_datetime64, text_column, datetime_text
+import numpy as np
+import asyncio
 import logging
 
 # Add logger for debugging
@@ -23,14 +40,123 @@ async def create_product(
 ):
     db_product = Product(**product.dict())
     db.add(db_product)
+    db.flush()
+    record_stock_change(db, db_product, db_product.stock or 0)
     db.commit()
     db.refresh(db_product)
     return db_product
 
 @router.get("/", response_model=List[ProductSchema])
-async def get_products(db: Session = Depends(get_db)):
+async def get_products(
+    abc_class: Optional[str] = Query(None, pattern="^[ABC]$"),
+    xyz_class: Optional[str] = Query(None, pattern="^[XYZ]$"),
+    max_stock: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Get products, optionally by ABC/XYZ class and at or below a stock level
+    (abc_class=A&max_stock=10 is a range scan on ix_products_abc_class_stock)
+    """
     # Use joinedload to eager load category relationship
-    return db.query(Product).options(joinedload(Product.category)).all()
+    stmt = select(Product).options(joinedload(Product.category))
+    if abc_class:
+        stmt = stmt.where(Product.abc_class == abc_class)
+    if xyz_class:
+        stmt = stmt.where(Product.xyz_class == xyz_class)
+    if max_stock is not None:
+        stmt = stmt.where(Product.stock <= max_stock)
+    return (await db.scalars(stmt)).all()
+
+@router.post("/classification/recompute", response_model=ClassificationRunResult)
+async def recompute_classification(
+    window_days: int = Query(CLASSIFICATION_WINDOW_DAYS, ge=7, le=730),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Reclassify every product by revenue share (ABC) and demand variability (XYZ)
+    """
+    try:
+        started = datetime.utcnow()
+        counts = classify_products(db, window_days)
+        db.commit()
+        return {
+            "products": sum(counts["abc"].values()),
+            "window_days": window_days,
+            "abc": counts["abc"],
+            "xyz": counts["xyz"],
+            "seconds": (datetime.utcnow() - started).total_seconds()
+        }
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Error classifying products: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/stock-as-of", response_model=StockAsOfResponse)
+async def get_stock_as_of(
+    at: str,
+    product_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get each product's total stock at the end of a past day (UTC).
+
+    Reconstructed from the nearest stock snapshot and the daily movement
+    ledger since then, so the cost depends on the snapshot interval rather
+    than on the amount of history.
+    """
+    try:
+        day = datetime.fromisoformat(at.replace('Z', '+00:00')).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid at format")
+    
+    try:
+        product_ids = [product_id] if product_id else None
+        result = stock_as_of(db, day, product_ids)
+        
+        query = db.query(Product.id, Product.name)
+        if product_id:
+            query = query.filter(Product.id == product_id)
+        products = [
+            {"product_id": id_, "name": name, "stock": result["stock"].get(id_, 0)}
+            for id_, name in query.order_by(Product.id)
+        ]
+        return {"at": day, "base": result["base"], "base_day": result["base_day"], "products": products}
+    except Exception as e:
+        logger.exception(f"Error in get_stock_as_of: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/forecasts/recompute", response_model=ForecastRunResult)
+async def recompute_forecasts(
+    request: Request,
+    history_days: int = Query(FORECAST_HISTORY_DAYS, ge=14, le=730),
+    horizon_days: int = Query(FORECAST_HORIZON_DAYS, ge=1, le=365),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Refit the demand forecast of every product from its daily sell-order
+    quantities and replace the stored forecasts
+    """
+    try:
+        started = datetime.utcnow()
+        product_ids, y = daily_sell_quantities(db, history_start(started, history_days), history_days)
+        # Hand the connection back while the fits run on the app's forecast pool
+        db.rollback()
+        forecasts, use_hw = await forecast_series_async(y, horizon_days, getattr(request.app.state, "forecast_pool", None))
+        store_forecasts(db, product_ids, forecasts, use_hw, started)
+        db.commit()
+        return {
+            "products": len(product_ids),
+            "history_days": history_days,
+            "horizon_days": horizon_days,
+            "seconds": (datetime.utcnow() - started).total_seconds()
+        }
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Error computing forecasts: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @router.get("/{product_id}", response_model=ProductSchema)
 async def get_product(
@@ -47,7 +173,19 @@ async def get_products_by_category(
     category_id: int,
     db: Session = Depends(get_db)
 ):
-    return db.query(Product).filter(Product.category_id == category_id).all()
+    """
+    Products held in the category, with stock as the quantity held there.
+    Since stock transfers move balances between locators instead of cloning
+    products, this includes products transferred in from other categories.
+    """
+    held = stock_in_category(db, category_id)
+    if not held:
+        return []
+    products = db.query(Product).options(joinedload(Product.category)).filter(Product.id.in_(held)).order_by(Product.id).all()
+    return [
+        ProductSchema.model_validate(product).model_copy(update={"stock": held[product.id]})
+        for product in products
+    ]
 
 @router.get("/detailed/{product_id}", response_model=ProductOut)
 async def get_product_detailed(
@@ -86,16 +224,110 @@ async def get_product_detailed(
             detail=f"Error serializing product data: {str(e)}"
         )
 
+def product_history_query(product_id: int, start: Optional[datetime], end: Optional[datetime], created_at=None):
+    """Completed transfers of a product in the date range, oldest first"""
+    query = select(
+        StockTransfer.id,
+        StockTransfer.created_at if created_at is None else created_at,
+        StockTransfer.quantity,
+        StockTransfer.source_location,
+        StockTransfer.destination_location,
+        StockTransfer.source_locator_name,
+        StockTransfer.destination_locator_name
+    ).where(
+        StockTransfer.product_id == product_id,
+        # Only get completed transfers for accurate history
+        StockTransfer.status == 'completed'
+    )
+    if start:
+        query = query.where(StockTransfer.created_at >= start)
+    if end:
+        query = query.where(StockTransfer.created_at <= end)
+    return query.order_by(StockTransfer.created_at)
+
+def product_history_items(db: Session, product_id: int, start: Optional[datetime], end: Optional[datetime]) -> List[dict]:
+    """Two history dicts per transfer: outgoing from source, incoming to destination"""
+    transfers = db.execute(product_history_query(product_id, start, end)).all()
+    logger.debug(f"Found {len(transfers)} transfers for product ID: {product_id}")
+    
+    history_items = []
+    for transfer in transfers:
+        notes = f"Transfer from {transfer.source_locator_name or 'unknown'} to {transfer.destination_locator_name or 'unknown'}"
+        # Outgoing from source
+        history_items.append({
+            "id": f"{transfer.id}-out",
+            "date": transfer.created_at,
+            "quantity": -transfer.quantity,  # Negative for outgoing
+            "type": "out",
+            "notes": notes,
+            "location": transfer.source_location,
+            "product_id": product_id,
+            "transfer_id": transfer.id
+        })
+        
+        # Incoming to destination
+        history_items.append({
+            "id": f"{transfer.id}-in",
+            "date": transfer.created_at,
+            "quantity": transfer.quantity,  # Positive for incoming
+            "type": "in",
+            "notes": notes,
+            "location": transfer.destination_location,
+            "product_id": product_id,
+            "transfer_id": transfer.id
+        })
+    return history_items
+
+def product_history_json(
+    db: Session, product_id: int, start: Optional[datetime], end: Optional[datetime], columnar: bool = False
+) -> bytes:
+    """
+    Same history as product_history_items, built column-wise with NumPy and
+    serialized straight to JSON without per-item model validation
+    """
+    created_at = datetime_text(StockTransfer.created_at, db.get_bind().dialect.name)
+    rows = db.connection().execute(product_history_query(product_id, start, end, created_at)).all()
+    logger.debug(f"Found {len(rows)} transfers for product ID: {product_id}")
+    ids, created_at, quantities, sources, destinations, source_names, destination_names = (
+        zip(*rows) if rows else [()] * 7
+    )
+    ids = np.array(ids, dtype=np.int64)
+    quantities = np.array(quantities, dtype=np.int64)
+    
+    notes = np.char.add(
+        np.char.add(np.char.add("Transfer from ", text_column(source_names, "unknown")), " to "),
+        text_column(destination_names, "unknown")
+    )
+    
+    columns = interleave_movements(
+        id_prefix=ids,
+        dates=to_datetime64(created_at),
+        product_ids=np.full(len(rows), product_id, dtype=np.int64),
+        transfer_ids=ids,
+        out_location=np.array(sources, dtype=object),
+        in_location=np.array(destinations, dtype=object),
+        out_quantity=-quantities,
+        in_quantity=quantities,
+        notes=notes
+    )
+    return columns_to_json(columns, columnar)
+
 @router.get("/{product_id}/history", response_model=List[StockHistoryResponse])
 async def get_product_history(
     product_id: int,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    engine: str = Query("python", pattern="^(python|numpy)$"),
+    format: str = Query("json", pattern="^(json|columnar)$"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get stock movement history for a specific product
+    Get stock movement history for a specific product.
+
+    engine=numpy builds the response with array operations, which is much
+    faster for products with many transfers; format=columnar (numpy only)
+    returns one array per field instead of a list of objects.
     """
     try:
         logger.debug(f"Fetching stock history for product ID: {product_id}")
@@ -105,63 +337,30 @@ async def get_product_history(
         if not product:
             raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
         
-        # Create a base query
-        query = db.query(StockTransfer).filter(StockTransfer.product_id == product_id)
-        
-        # Only get completed transfers for accurate history
-        query = query.filter(StockTransfer.status == 'completed')
-        
         # Apply date filters if provided
+        start = None
         if start_date:
             try:
                 start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at >= start)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid start_date format")
         
+        end = None
         if end_date:
             try:
                 end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at <= end)
             except ValueError:
                 raise HTTPException(status_code=400, detail="Invalid end_date format")
         
         # Default to last 6 months if no dates provided
         if not start_date and not end_date:
-            six_months_ago = datetime.now() - timedelta(days=180)
-            query = query.filter(StockTransfer.created_at >= six_months_ago)
-        
-        # Order by date
-        transfers = query.order_by(StockTransfer.created_at).all()
-        logger.debug(f"Found {len(transfers)} transfers for product ID: {product_id}")
+            start = datetime.now() - timedelta(days=180)
         
-        # Convert to history response format
-        history_items = []
-        for transfer in transfers:
-            # Outgoing from source
-            history_items.append({
-                "id": f"{transfer.id}-out",
-                "date": transfer.created_at,
-                "quantity": -transfer.quantity,  # Negative for outgoing
-                "type": "out",
-                "notes": f"Transfer from {transfer.source_locator_name or 'unknown'} to {transfer.destination_locator_name or 'unknown'}",
-                "location": transfer.source_location,
-                "product_id": transfer.product_id,
-                "transfer_id": transfer.id
-            })
-            
-            # Incoming to destination
-            history_items.append({
-                "id": f"{transfer.id}-in",
-                "date": transfer.created_at,
-                "quantity": transfer.quantity,  # Positive for incoming
-                "type": "in",
-                "notes": f"Transfer from {transfer.source_locator_name or 'unknown'} to {transfer.destination_locator_name or 'unknown'}",
-                "location": transfer.destination_location,
-                "product_id": transfer.product_id,
-                "transfer_id": transfer.id
-            })
+        if engine == "numpy" or format == "columnar":
+            body = product_history_json(db, product_id, start, end, columnar=format == "columnar")
+            return Response(content=body, media_type="application/json")
         
+        history_items = product_history_items(db, product_id, start, end)
         logger.debug(f"Returning {len(history_items)} history items for product ID: {product_id}")
         return history_items
         
@@ -171,3 +370,31 @@ async def get_product_history(
     except Exception as e:
         logger.exception(f"Error in get_product_history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/{product_id}/forecast", response_model=ProductForecastResponse)
+async def get_product_forecast(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the stored daily demand forecast of a product, as written by the
+    forecasting job (python -m app.forecasting or POST /products/forecasts/recompute)
+    """
+    rows = db.execute(
+        select(ProductForecast.day, ProductForecast.qty, ProductForecast.method, ProductForecast.generated_at)
+        .where(ProductForecast.product_id == product_id)
+        .order_by(ProductForecast.day)
+    ).all()
+    if not rows:
+        if not db.query(Product.id).filter(Product.id == product_id).first():
+            raise HTTPException(status_code=404, detail="Product not found")
+        # No sales in the fitted history, so nothing was forecast
+        return {"product_id": product_id, "method": "none", "generated_at": None, "total": 0.0, "forecast": []}
+    return {
+        "product_id": product_id,
+        "method": rows[0].method,
+        "generated_at": rows[0].generated_at,
+        "total": sum(row.qty for row in rows),
+        "forecast": [{"day": row.day, "qty": row.qty} for row in rows]
+    }
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from typing import List
+from ..database import get_db
+from ..models.product import Product
+from ..models.replenishment import ProductReplenishment
+from ..schemas.replenishment import ProductReplenishmentResponse, ReplenishmentRunResult
+from ..replenishment import compute_replenishment, REPLENISHMENT_WINDOW_DAYS, REPLENISHMENT_SERVICE_LEVEL
+from ..utils import get_current_user
+from datetime import datetime
+import logging
+
+# Add logger for debugging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/replenishment", tags=["Replenishment"])
+
+def _replenishment_query():
+    stock = func.coalesce(Product.stock, 0)
+    return (
+        select(
+            ProductReplenishment,
+            Product.name.label("product_name"),
+            stock.label("stock"),
+            (stock <= ProductReplenishment.reorder_point).label("needs_reorder")
+        )
+        .join(Product, Product.id == ProductReplenishment.product_id)
+    )
+
+def _response(row) -> dict:
+    replenishment, product_name, stock, needs_reorder = row
+    return {
+        "product_id": replenishment.product_id,
+        "product_name": product_name,
+        "stock": stock,
+        "avg_daily_demand": replenishment.avg_daily_demand,
+        "demand_variance": replenishment.demand_variance,
+        "lead_time_days": replenishment.lead_time_days,
+        "safety_stock": replenishment.safety_stock,
+        "reorder_point": replenishment.reorder_point,
+        "needs_reorder": bool(needs_reorder),
+        "window_days": replenishment.window_days,
+        "service_level": replenishment.service_level,
+        "computed_at": replenishment.computed_at,
+    }
+
+@router.get("/", response_model=List[ProductReplenishmentResponse])
+async def get_replenishment(
+    needs_reorder: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get computed reorder points and safety stock, optionally only for
+    products whose stock is at or below their reorder point
+    """
+    try:
+        query = _replenishment_query()
+        if needs_reorder:
+            query = query.where(func.coalesce(Product.stock, 0) <= ProductReplenishment.reorder_point)
+        rows = db.execute(query.order_by(ProductReplenishment.product_id).offset(skip).limit(limit)).all()
+        return [_response(row) for row in rows]
+    except Exception as e:
+        logger.exception(f"Error fetching replenishment data: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/{product_id}", response_model=ProductReplenishmentResponse)
+async def get_product_replenishment(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the computed reorder point and safety stock of a product
+    """
+    row = db.execute(_replenishment_query().where(ProductReplenishment.product_id == product_id)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="No replenishment data for this product")
+    return _response(row)
+
+@router.post("/recompute", response_model=ReplenishmentRunResult)
+async def recompute_replenishment(
+    window_days: int = Query(REPLENISHMENT_WINDOW_DAYS, ge=7, le=730),
+    service_level: float = Query(REPLENISHMENT_SERVICE_LEVEL, gt=0.5, lt=1.0),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Recompute demand statistics, safety stock and reorder points for every product
+    """
+    try:
+        started = datetime.utcnow()
+        products = compute_replenishment(db, window_days, service_level)
+        db.commit()
+        return {
+            "products": products,
+            "window_days": window_days,
+            "service_level": service_level,
+            "seconds": (datetime.utcnow() - started).total_seconds()
+        }
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Error computing replenishment: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..replicas import get_async_read_db
+from ..models.stock_balance import StockBalance
+from ..models.product import Product
+from ..models.organization import Locator
+from ..schemas.stock_balance import StockBalanceResponse, ProductStockTotal
+from ..utils import get_current_user
+import logging
+
+# Add logger for debugging
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/stock-balances", tags=["Stock Balances"])
+
+def _balance_query():
+    return (
+        select(
+            StockBalance.product_id,
+            Product.name.label("product_name"),
+            StockBalance.locator_id,
+            Locator.code.label("locator_code"),
+            StockBalance.qty
+        )
+        .join(Product, Product.id == StockBalance.product_id)
+        .join(Locator, Locator.id == StockBalance.locator_id)
+        .where(StockBalance.qty != 0)
+    )
+
+@router.get("/by-locator/{locator_id}", response_model=List[StockBalanceResponse])
+async def get_stock_by_locator(
+    locator_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the stock of every product held at a locator
+    """
+    stmt = _balance_query().where(StockBalance.locator_id == locator_id).order_by(StockBalance.product_id)
+    return [row._asdict() for row in await db.execute(stmt)]
+
+@router.get("/by-product/{product_id}", response_model=List[StockBalanceResponse])
+async def get_stock_by_product(
+    product_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get where a product's stock is held, per locator
+    """
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail=f"Product with ID {product_id} not found")
+
+    stmt = _balance_query().where(StockBalance.product_id == product_id).order_by(StockBalance.locator_id)
+    return [row._asdict() for row in await db.execute(stmt)]
+
+@router.get("/totals", response_model=List[ProductStockTotal])
+async def get_stock_totals(
+    product_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Get the total stock held across all locators, per product
+    """
+    stmt = (
+        select(
+            StockBalance.product_id,
+            func.sum(StockBalance.qty).label("total_qty"),
+            func.count(StockBalance.locator_id).label("locator_count")
+        )
+        .where(StockBalance.qty != 0)
+        .group_by(StockBalance.product_id)
+        .order_by(StockBalance.product_id)
+    )
+    if product_id is not None:
+        stmt = stmt.where(StockBalance.product_id == product_id)
+    return [row._asdict() for row in await db.execute(stmt)]
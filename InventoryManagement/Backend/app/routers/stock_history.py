@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, func, case, cast, Integer, literal
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..database import get_db
+from ..replicas import get_async_read_db
+from ..models.stock_movement import StockMovementDaily, UNASSIGNED_LOCATOR
 from ..models.stock_transfer import StockTransfer
 from ..schemas.stock_transfer import StockHistoryResponse
 from ..utils import get_current_user
+from ..analytics import interleave_movements, select_rows, columns_to_json, to_datetime64, text_column, as_datetime
 from datetime import datetime, timedelta
+import numpy as np
 import logging
 
 # Add logger for debugging
@@ -13,87 +18,208 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/stock-history", tags=["Stock History"])
 
+def bucket_start(column, bucket: str, dialect: str):
+    """
+    SQL expression truncating a date/datetime column to the start of its
+    hour, day, week (Monday) or month
+    """
+    if dialect == "mysql":
+        if bucket == "hour":
+            return func.date_format(column, "%Y-%m-%d %H:00:00")
+        if bucket == "day":
+            return func.date(column)
+        if bucket == "week":
+            return func.subdate(func.date(column), func.weekday(column))
+        return func.date_format(column, "%Y-%m-01")
+
+    # SQLite
+    if bucket == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", column)
+    if bucket == "day":
+        return func.date(column)
+    if bucket == "week":
+        days_since_monday = (cast(func.strftime("%w", column), Integer) + 6) % 7
+        return func.date(column, func.printf("-%d days", days_since_monday))
+    return func.strftime("%Y-%m-01", column)
+
+def _history_items(rows, movement_type: Optional[str]):
+    """Expand (date, product, locator, qty_in, qty_out) rows into in/out history items"""
+    history_items = []
+    for when, row_product_id, row_locator_id, qty_in, qty_out in rows:
+        when = as_datetime(when)
+        if row_locator_id == UNASSIGNED_LOCATOR:
+            row_locator_id = None
+        for item_type, quantity in (("out", qty_out), ("in", qty_in)):
+            if not quantity or (movement_type and item_type != movement_type):
+                continue
+            history_items.append({
+                "id": f"{when.isoformat()}-{row_product_id or 'all'}-{row_locator_id or 'all'}-{item_type}",
+                "date": when,
+                "quantity": int(quantity),
+                "type": item_type,
+                "location": row_locator_id,
+                "product_id": row_product_id,
+                "transfer_id": None
+            })
+    return history_items
+
+def _history_json(rows, movement_type: Optional[str], columnar: bool = False) -> bytes:
+    """Vectorized equivalent of _history_items, serialized straight to JSON"""
+    when, product_ids, locator_ids, qty_in, qty_out = zip(*rows) if rows else [()] * 5
+    dates = to_datetime64(when)
+    product_ids = np.array(product_ids, dtype=object)
+    locator_ids = np.array(locator_ids, dtype=object)
+    locator_ids[locator_ids == UNASSIGNED_LOCATOR] = None
+    id_prefix = np.char.add(
+        np.char.add(np.char.add(np.datetime_as_string(dates, unit="s"), "-"), text_column(product_ids, "all")),
+        np.char.add("-", text_column(locator_ids, "all"))
+    )
+
+    columns = interleave_movements(
+        id_prefix=id_prefix,
+        dates=dates,
+        product_ids=product_ids,
+        transfer_ids=np.full(len(dates), None, dtype=object),
+        out_location=locator_ids,
+        in_location=locator_ids,
+        out_quantity=np.array(qty_out, dtype=np.int64),
+        in_quantity=np.array(qty_in, dtype=np.int64),
+        notes=np.full(len(dates), None, dtype=object)
+    )
+    keep = columns["quantity"] != 0
+    if movement_type:
+        keep &= columns["type"] == movement_type
+    return columns_to_json(select_rows(columns, keep), columnar)
+
+def hourly_transfer_movements(db: Session, start, end, product_id, locator_id):
+    """
+    Completed transfers grouped per hour of created_at, the only movements
+    recorded with sub-day timestamps. Served by ix_stock_transfers_status_created_at.
+    """
+    transfers = StockTransfer.__table__
+    hour = bucket_start(transfers.c.created_at, "hour", db.get_bind().dialect.name)
+    if locator_id:
+        qty_in = func.sum(case((transfers.c.destination_location == locator_id, transfers.c.quantity), else_=0))
+        qty_out = func.sum(case((transfers.c.source_location == locator_id, transfers.c.quantity), else_=0))
+    else:
+        # Every transfer leaves one locator and enters another
+        qty_in = qty_out = func.sum(transfers.c.quantity)
+
+    query = select(hour, qty_in, qty_out).where(transfers.c.status == "completed")
+    if start:
+        query = query.where(transfers.c.created_at >= start)
+    if end:
+        query = query.where(transfers.c.created_at <= end)
+    if product_id:
+        query = query.where(transfers.c.product_id == product_id)
+    if locator_id:
+        query = query.where((transfers.c.source_location == locator_id) | (transfers.c.destination_location == locator_id))
+
+    rows = db.execute(query.group_by(hour).order_by(hour)).all()
+    return [(when, product_id, locator_id, qty_in, qty_out) for when, qty_in, qty_out in rows]
+
+def daily_movements(db: Session, start, end, product_id, locator_id, bucket: Optional[str]):
+    """
+    Rows of the daily rollup, or their sums per day/week/month when a bucket
+    is given. Row count grows with days, not with transfer volume.
+    """
+    movements = StockMovementDaily.__table__
+    if bucket:
+        when = bucket_start(movements.c.day, bucket, db.get_bind().dialect.name)
+        query = select(
+            when,
+            literal(product_id) if product_id else literal(None, Integer),
+            literal(locator_id) if locator_id else literal(None, Integer),
+            func.sum(movements.c.qty_in),
+            func.sum(movements.c.qty_out)
+        )
+    else:
+        query = select(
+            movements.c.day, movements.c.product_id, movements.c.locator_id,
+            movements.c.qty_in, movements.c.qty_out
+        )
+
+    if start:
+        query = query.where(movements.c.day >= start.date())
+    if end:
+        query = query.where(movements.c.day <= end.date())
+    if product_id:
+        query = query.where(movements.c.product_id == product_id)
+    if locator_id:
+        query = query.where(movements.c.locator_id == locator_id)
+
+    if bucket:
+        query = query.group_by(when).order_by(when)
+    else:
+        query = query.order_by(movements.c.day, movements.c.product_id, movements.c.locator_id)
+    return db.execute(query).all()
+
 @router.get("/", response_model=List[StockHistoryResponse])
 async def get_stock_history(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    bucket: Optional[str] = Query(None, pattern="^(hour|day|week|month)$"),
+    product_id: Optional[int] = None,
+    locator_id: Optional[int] = None,
+    type: Optional[str] = Query(None, pattern="^(in|out)$"),
+    engine: str = Query("python", pattern="^(python|numpy)$"),
+    format: str = Query("json", pattern="^(json|columnar)$"),
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get stock movement history for dashboard visualizations
+    Get stock movement history for dashboard visualizations, aggregated per day
+    from transfer completions and order approvals.
+
+    With bucket, movements are summed per hour, day, week or month in the
+    database and one item is returned per bucket and direction. Hourly
+    buckets only cover stock transfers.
+
+    engine=numpy builds the response with array operations; format=columnar
+    (numpy only) returns one array per field instead of a list of objects.
     """
     try:
         logger.debug("Fetching stock history data")
-        
-        # Create a base query
-        query = db.query(StockTransfer)
-        
-        # Only get completed transfers for accurate history
-        query = query.filter(StockTransfer.status == 'completed')
-        
-        # Apply date filters if provided
+
+        start = None
         if start_date:
             try:
-                start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at >= start)
+                start = datetime.fromisoformat(start_date.replace('Z', '+00:00')).replace(tzinfo=None)
                 logger.debug(f"Filtering by start date: {start}")
             except ValueError as e:
                 logger.error(f"Invalid start_date format: {e}")
                 raise HTTPException(status_code=400, detail="Invalid start_date format")
-        
+
+        end = None
         if end_date:
             try:
-                end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at <= end)
+                end = datetime.fromisoformat(end_date.replace('Z', '+00:00')).replace(tzinfo=None)
                 logger.debug(f"Filtering by end date: {end}")
             except ValueError as e:
                 logger.error(f"Invalid end_date format: {e}")
                 raise HTTPException(status_code=400, detail="Invalid end_date format")
-        
+
         # Default to last 6 months if no dates provided
         if not start_date and not end_date:
-            six_months_ago = datetime.now() - timedelta(days=180)
-            query = query.filter(StockTransfer.created_at >= six_months_ago)
-            logger.debug(f"Using default date range: {six_months_ago} to now")
-        
-        # Order by date
-        transfers = query.order_by(StockTransfer.created_at).all()
-        logger.debug(f"Found {len(transfers)} transfers")
-        
-        # Generate empty history if no transfers found
-        if not transfers:
-            logger.info("No transfers found, returning empty history")
-            return []
-            
-        # Convert to history response format
-        history_items = []
-        for transfer in transfers:
-            # Outgoing from source
-            history_items.append({
-                "id": f"{transfer.id}-out",
-                "date": transfer.created_at,
-                "quantity": transfer.quantity,
-                "type": "out",
-                "location": transfer.source_location,
-                "product_id": transfer.product_id,
-                "transfer_id": transfer.id
-            })
-            
-            # Incoming to destination
-            history_items.append({
-                "id": f"{transfer.id}-in",
-                "date": transfer.created_at,
-                "quantity": transfer.quantity,
-                "type": "in",
-                "location": transfer.destination_location,
-                "product_id": transfer.product_id,
-                "transfer_id": transfer.id
-            })
-        
+            start = datetime.now() - timedelta(days=180)
+            logger.debug(f"Using default date range: {start} to now")
+
+        if bucket == "hour":
+            rows = await db.run_sync(hourly_transfer_movements, start, end, product_id, locator_id)
+        else:
+            rows = await db.run_sync(daily_movements, start, end, product_id, locator_id, bucket)
+        logger.debug(f"Found {len(rows)} movement rows")
+
+        if engine == "numpy" or format == "columnar":
+            body = _history_json(rows, type, columnar=format == "columnar")
+            return Response(content=body, media_type="application/json")
+
+        history_items = _history_items(rows, type)
         logger.debug(f"Returning {len(history_items)} history items")
         return history_items
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception(f"Error in get_stock_history: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
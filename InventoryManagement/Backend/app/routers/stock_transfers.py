@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, or_, and_, case, func
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from ..database import get_db
-from ..models.stock_transfer import StockTransfer
+from ..replicas import get_read_db, get_async_read_db
+from ..models.stock_transfer import StockTransfer, StockTransferTransition, TRANSFER_STATUS_CODES
 from ..models.product import Product
 from ..models.organization import Locator, SubInventory  # Fixed import
 from ..models.category import Category
-from ..schemas.stock_transfer import StockTransferCreate, StockTransferUpdate, StockTransferResponse
+from ..schemas.stock_transfer import StockTransferCreate, StockTransferUpdate, StockTransferResponse, ConsolidationResult, StockTransferStats
+from ..stock import move_stock, claim_status_change, InsufficientStockError
 from ..utils import get_current_user
+from ..analytics import to_datetime64, seconds_between, grouped_percentiles, hourly_counts
 from datetime import datetime, timedelta
+import base64
+import numpy as np
 import logging
+import orjson
 from fastapi.responses import FileResponse
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
@@ -108,100 +116,253 @@ async def create_stock_transfer(
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+def consolidate_pending_transfers(db: Session, dry_run: bool = False) -> dict:
+    """
+    Merge pending transfers that move the same product between the same
+    locations and destination category into the oldest one of each group.
+
+    The absorbed transfers are kept with status 'merged' and point at the
+    surviving transfer, which records their ids.
+    """
+    pending = (
+        db.query(StockTransfer)
+        .filter(StockTransfer.status == "pending")
+        .order_by(StockTransfer.created_at, StockTransfer.id)
+        .all()
+    )
+
+    groups = {}
+    for transfer in pending:
+        key = (
+            transfer.product_id,
+            transfer.source_location,
+            transfer.destination_location,
+            transfer.destination_category_id
+        )
+        groups.setdefault(key, []).append(transfer)
+
+    consolidated = []
+    merged_count = 0
+    for transfers in groups.values():
+        if len(transfers) < 2:
+            continue
+
+        survivor, absorbed = transfers[0], transfers[1:]
+        if not dry_run:
+            # The rows were read without a lock, so claim each one with a
+            # conditional UPDATE: a transfer approved or cancelled since then
+            # drops out of the merge instead of having its status overwritten.
+            # The claims hold the rows until commit, so an approve or cancel
+            # racing with the merge gets a 409.
+            if not claim_status_change(db, StockTransfer, survivor.id, ["pending"], "pending"):
+                continue
+            absorbed = [
+                transfer for transfer in absorbed
+                if claim_status_change(db, StockTransfer, transfer.id, ["pending"], "merged")
+            ]
+            if not absorbed:
+                continue
+
+        absorbed_ids = [transfer.id for transfer in absorbed]
+        quantity = survivor.quantity + sum(transfer.quantity for transfer in absorbed)
+        consolidated.append({"id": survivor.id, "merged_ids": absorbed_ids, "quantity": quantity})
+        merged_count += len(absorbed)
+        if dry_run:
+            continue
+
+        now = datetime.utcnow()
+        for transfer in absorbed:
+            transfer.status = "merged"
+            transfer.merged_into_id = survivor.id
+            transfer.updated_at = now
+
+        previous_ids = survivor.merged_transfer_ids.split(",") if survivor.merged_transfer_ids else []
+        survivor.merged_transfer_ids = ",".join(previous_ids + [str(transfer_id) for transfer_id in absorbed_ids])
+        survivor.quantity = quantity
+        survivor.updated_at = now
+        logger.info(f"Merged transfers {absorbed_ids} into {survivor.id}, new quantity {quantity}")
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    return {"groups": len(consolidated), "merged": merged_count, "transfers": consolidated}
+
+@router.post("/consolidate", response_model=ConsolidationResult)
+async def consolidate_stock_transfers(
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Merge duplicate pending transfers so each is approved, completed and reported once
+    """
+    try:
+        return consolidate_pending_transfers(db, dry_run=dry_run)
+    except Exception as e:
+        logger.exception(f"Error consolidating stock transfers: {str(e)}")
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+# Columns returned by the transfer list, in the order they are unpacked
+# below. Selecting just these avoids building full ORM objects for every row.
+TRANSFER_LIST_COLUMNS = [
+    StockTransfer.id,
+    StockTransfer.product_id,
+    StockTransfer.source_location,
+    StockTransfer.destination_location,
+    StockTransfer.quantity,
+    StockTransfer.status,
+    StockTransfer.notes,
+    StockTransfer.created_at,
+    StockTransfer.updated_at,
+    StockTransfer.source_subinventory_name,
+    StockTransfer.source_locator_name,
+    StockTransfer.source_category_name,
+    StockTransfer.source_product_name,
+    StockTransfer.destination_subinventory_name,
+    StockTransfer.destination_locator_name,
+    StockTransfer.destination_category_name,
+    StockTransfer.merged_into_id,
+    StockTransfer.merged_transfer_ids,
+]
+
+def encode_transfer_cursor(created_at: datetime, transfer_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{transfer_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_transfer_cursor(cursor: str):
+    try:
+        created_at, transfer_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(transfer_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def fetch_stock_transfer_page(
+    db: Session,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
+    """
+    Fetch transfers newest first as JSON bytes, plus the cursor of the next page
+    """
+    stmt = (
+        select(*TRANSFER_LIST_COLUMNS, Product.name.label("product_name"))
+        .select_from(StockTransfer.__table__.outerjoin(Product.__table__, StockTransfer.product_id == Product.id))
+    )
+
+    if status:
+        stmt = stmt.where(StockTransfer.status == status)
+    if start:
+        stmt = stmt.where(StockTransfer.created_at >= start)
+    if end:
+        stmt = stmt.where(StockTransfer.created_at <= end)
+
+    # Keyset pagination on (created_at, id) so deep pages cost the same as the first
+    if cursor:
+        after_created_at, after_id = decode_transfer_cursor(cursor)
+        stmt = stmt.where(or_(
+            StockTransfer.created_at < after_created_at,
+            and_(StockTransfer.created_at == after_created_at, StockTransfer.id < after_id)
+        ))
+
+    stmt = stmt.order_by(StockTransfer.created_at.desc(), StockTransfer.id.desc())
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+
+    # Execute on the connection so rows skip ORM result processing
+    rows = db.connection().execute(stmt).all()
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_transfer_cursor(last.created_at, last.id)
+
+    # Build plain dicts in one pass; orjson writes them (and datetimes) straight to bytes
+    items = [
+        {
+            "id": id_,
+            "product_id": product_id,
+            "source_location": source_location,
+            "destination_location": destination_location,
+            "quantity": quantity,
+            "status": status_,
+            "notes": notes,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "source_subinventory_name": source_subinventory_name,
+            "source_locator_name": source_locator_name,
+            "source_category_name": source_category_name,
+            "source_product_name": source_product_name,
+            "destination_subinventory_name": destination_subinventory_name,
+            "destination_locator_name": destination_locator_name,
+            "destination_category_name": destination_category_name,
+            "merged_into_id": merged_into_id,
+            "merged_transfer_ids": merged_transfer_ids,
+            "product": {"id": product_id, "name": product_name} if product_name is not None else None,
+            "source": None,
+            "destination": None,
+        }
+        for (
+            id_, product_id, source_location, destination_location, quantity, status_, notes,
+            created_at, updated_at, source_subinventory_name, source_locator_name,
+            source_category_name, source_product_name, destination_subinventory_name,
+            destination_locator_name, destination_category_name, merged_into_id,
+            merged_transfer_ids, product_name
+        ) in rows
+    ]
+
+    return orjson.dumps(items), next_cursor
+
 @router.get("/", response_model=List[StockTransferResponse])
 async def get_stock_transfers(
     status: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    limit: Optional[int] = Query(None, ge=1, le=100000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
     current_user = Depends(get_current_user)
 ):
     """
-    Get all stock transfers with optional filtering
+    Get stock transfers with optional filtering.
+
+    Pass limit to page through results; the next page's cursor is returned in
+    the X-Next-Cursor header.
     """
     try:
         logger.debug("Fetching stock transfers")
         
-        # Create a base query with eager loading of the product relationship
-        query = db.query(StockTransfer).options(
-            joinedload(StockTransfer.product, innerjoin=False)
-        )
-        
-        # Apply filters
-        if status:
-            query = query.filter(StockTransfer.status == status)
-            logger.debug(f"Filtering by status: {status}")
-        
+        start = None
         if start_date:
             try:
                 start = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at >= start)
                 logger.debug(f"Filtering by start date: {start}")
             except ValueError as e:
                 logger.error(f"Invalid start_date format: {e}")
                 raise HTTPException(status_code=400, detail="Invalid start_date format")
         
+        end = None
         if end_date:
             try:
                 end = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
-                query = query.filter(StockTransfer.created_at <= end)
                 logger.debug(f"Filtering by end date: {end}")
             except ValueError as e:
                 logger.error(f"Invalid end_date format: {e}")
                 raise HTTPException(status_code=400, detail="Invalid end_date format")
         
-        # Order by most recent first
-        transfers = query.order_by(StockTransfer.created_at.desc()).all()
-        logger.debug(f"Found {len(transfers)} transfers")
-        
-        # Handle empty results
-        if not transfers:
-            logger.info("No transfers found")
-            return []
-        
-        # Safely create response objects
-        response_transfers = []
-        for transfer in transfers:
-            # Create base transfer dictionary
-            transfer_dict = {
-                "id": transfer.id,
-                "product_id": transfer.product_id,
-                "source_location": transfer.source_location,
-                "destination_location": transfer.destination_location,
-                "quantity": transfer.quantity,
-                "status": transfer.status,
-                "notes": transfer.notes,
-                "created_at": transfer.created_at,
-                "updated_at": transfer.updated_at,
-                "source_subinventory_name": transfer.source_subinventory_name,
-                "source_locator_name": transfer.source_locator_name,
-                "source_category_name": transfer.source_category_name,
-                "source_product_name": transfer.source_product_name,
-                "destination_subinventory_name": transfer.destination_subinventory_name,
-                "destination_locator_name": transfer.destination_locator_name,
-                "destination_category_name": transfer.destination_category_name,
-                # Safely handle product relationship
-                "product": None
-            }
-            
-            # Check if product exists and add its details
-            if hasattr(transfer, 'product') and transfer.product is not None:
-                transfer_dict["product"] = {
-                    "id": transfer.product.id,
-                    "name": transfer.product.name
-                }
-            # If using query without eager loading, fetch product manually
-            elif transfer.product_id:
-                product = db.query(Product).filter(Product.id == transfer.product_id).first()
-                if product:
-                    transfer_dict["product"] = {
-                        "id": product.id,
-                        "name": product.name
-                    }
-            
-            response_transfers.append(transfer_dict)
+        body, next_cursor = await db.run_sync(fetch_stock_transfer_page, status, start, end, limit, cursor)
         
-        return response_transfers
+        # The body is already serialized, so skip response_model re-validation
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        return Response(content=body, media_type="application/json", headers=headers)
         
     except HTTPException:
         # Re-raise HTTP exceptions as they're already handled
@@ -210,6 +371,123 @@ async def get_stock_transfers(
         logger.exception(f"Error in get_stock_transfers: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+def compute_transfer_stats(db: Session, start: datetime, end: datetime) -> dict:
+    """
+    Throughput and lead times of transfers completed in [start, end).
+
+    One grouped query pivots each transfer's transition log into a row of
+    timestamps; everything after that is vectorized NumPy.
+    """
+    t = StockTransferTransition.__table__
+    st = StockTransfer.__table__
+
+    def reached(status):
+        return func.min(case((t.c.to_status == TRANSFER_STATUS_CODES[status], t.c.at)))
+
+    completed_in_window = select(t.c.transfer_id).where(
+        t.c.to_status == TRANSFER_STATUS_CODES["completed"],
+        t.c.at >= start,
+        t.c.at < end
+    )
+    stmt = (
+        select(
+            st.c.source_location,
+            st.c.destination_location,
+            st.c.source_locator_name,
+            st.c.destination_locator_name,
+            reached("pending").label("pending_at"),
+            reached("processing").label("processing_at"),
+            reached("completed").label("completed_at"),
+        )
+        .select_from(t.join(st, st.c.id == t.c.transfer_id))
+        .where(t.c.transfer_id.in_(completed_in_window))
+        .group_by(
+            t.c.transfer_id, st.c.source_location, st.c.destination_location,
+            st.c.source_locator_name, st.c.destination_locator_name
+        )
+    )
+    rows = db.connection().execute(stmt).all()
+
+    result = {"start": start, "end": end, "completed": len(rows), "throughput": [], "lead_times": []}
+    if not rows:
+        return result
+
+    sources, destinations, source_names, destination_names, pending_at, processing_at, completed_at = zip(*rows)
+    pending_at = to_datetime64(pending_at)
+    processing_at = to_datetime64(processing_at)
+    completed_at = to_datetime64(completed_at)
+
+    hours, counts = hourly_counts(completed_at)
+    result["throughput"] = [
+        {"hour": hour.astype(datetime), "completed": int(count)}
+        for hour, count in zip(hours, counts)
+    ]
+
+    # Number each (source, destination) pair; missing locators group as -1
+    pairs = np.array(
+        [(s if s is not None else -1, d if d is not None else -1) for s, d in zip(sources, destinations)],
+        dtype=np.int64
+    )
+    unique_pairs, first_index, pair_ids = np.unique(pairs, axis=0, return_index=True, return_inverse=True)
+    pair_ids = pair_ids.reshape(-1)
+    transfers_per_pair = np.bincount(pair_ids, minlength=len(unique_pairs))
+
+    stages = {
+        "pending": seconds_between(pending_at, processing_at),
+        "processing": seconds_between(processing_at, completed_at),
+        "total": seconds_between(pending_at, completed_at),
+    }
+    empty = {"p50": None, "p95": None, "p99": None}
+    lead_times = [
+        {
+            "source_location": int(source) if source >= 0 else None,
+            "destination_location": int(destination) if destination >= 0 else None,
+            "source_locator_name": source_names[first],
+            "destination_locator_name": destination_names[first],
+            "transfers": int(transfers_per_pair[i]),
+            **{stage: dict(empty) for stage in stages},
+        }
+        for i, ((source, destination), first) in enumerate(zip(unique_pairs, first_index))
+    ]
+    for stage, seconds in stages.items():
+        groups, _, table = grouped_percentiles(pair_ids, seconds)
+        for group, (p50, p95, p99) in zip(groups, table):
+            lead_times[group][stage] = {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+    result["lead_times"] = lead_times
+    return result
+
+@router.get("/stats", response_model=StockTransferStats)
+async def get_stock_transfer_stats(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Completed transfers per hour and p50/p95/p99 lead times per locator pair.
+
+    Defaults to the last 7 days. Lead times are in seconds, split into time
+    spent pending (until approval) and processing (until completion).
+    """
+    try:
+        try:
+            end = datetime.fromisoformat(end_date.replace('Z', '+00:00')) if end_date else datetime.utcnow()
+            start = datetime.fromisoformat(start_date.replace('Z', '+00:00')) if start_date else end - timedelta(days=7)
+        except ValueError as e:
+            logger.error(f"Invalid date format: {e}")
+            raise HTTPException(status_code=400, detail="Invalid start_date or end_date format")
+        if start >= end:
+            raise HTTPException(status_code=400, detail="start_date must be before end_date")
+
+        return compute_transfer_stats(db, start.replace(tzinfo=None), end.replace(tzinfo=None))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception(f"Error computing stock transfer stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
 @router.get("/{transfer_id}", response_model=StockTransferResponse)
 async def get_stock_transfer(
     transfer_id: int,
@@ -257,7 +535,12 @@ async def approve_stock_transfer(
             raise HTTPException(status_code=404, detail="Stock transfer not found")
         
         if transfer.status != "pending":
-            raise HTTPException(status_code=400, detail=f"Cannot approve transfer with status '{transfer.status}'")
+            raise HTTPException(status_code=409, detail=f"Cannot approve transfer with status '{transfer.status}'")
+        
+        # Claim the transfer so a concurrent approve, cancel or merge cannot also act on it
+        if not claim_status_change(db, StockTransfer, transfer.id, ["pending"], "processing"):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Stock transfer has already been processed")
         
         transfer.status = "processing"
         transfer.updated_at = datetime.utcnow()
@@ -297,7 +580,7 @@ async def complete_stock_transfer(
             raise HTTPException(status_code=404, detail="Stock transfer not found")
         
         if transfer.status != "processing":
-            raise HTTPException(status_code=400, detail=f"Cannot complete transfer with status '{transfer.status}'")
+            raise HTTPException(status_code=409, detail=f"Cannot complete transfer with status '{transfer.status}'")
         
         # Get source product - use the relationship if available
         source_product = transfer.product
@@ -307,65 +590,19 @@ async def complete_stock_transfer(
             if not source_product:
                 raise HTTPException(status_code=404, detail=f"Source product ID {transfer.product_id} not found")
         
-        # Check if sufficient stock is still available
-        if source_product.stock < transfer.quantity:
-            raise HTTPException(status_code=400, detail=f"Insufficient stock available. Requested: {transfer.quantity}, Available: {source_product.stock}")
-        
-        # Handle destination product
-        # First check if this product already exists at the destination location & category
-        destination_product = None
-        
-        # Get proper destination category ID
-        destination_category_id = None
-        
-        # Log what we're doing with debug info
-        logger.info(f"Transfer data: destination_category_name={transfer.destination_category_name}")
-        
-        # Direct approach: Use destination_category_id from transfer if available
-        if transfer.destination_category_id is not None:
-            destination_category_id = transfer.destination_category_id
-            logger.info(f"Using direct destination_category_id: {destination_category_id}")
-        # Fallback approach - use the destination_category_name to find the category
-        elif transfer.destination_category_name:
-            destination_category = db.query(Category).filter(
-                Category.name == transfer.destination_category_name
-            ).first()
-            if destination_category:
-                destination_category_id = destination_category.id
-                logger.info(f"Found destination category ID {destination_category_id} from name lookup")
-            else:
-                logger.warning(f"Could not find category with name: {transfer.destination_category_name}")
-        else:
-            logger.warning("No destination category information found in transfer record")
-        
-        logger.info(f"Final destination category ID for product creation: {destination_category_id}")
-        logger.info(f"Checking for existing product '{source_product.name}' at destination with category ID: {destination_category_id}")
-
-        if destination_category_id:
-            destination_product = db.query(Product).filter(
-                Product.name == source_product.name,
-                Product.category_id == destination_category_id
-            ).first()
+        # Claim the transfer first so a concurrent completion cannot move the stock twice
+        if not claim_status_change(db, StockTransfer, transfer.id, ["processing"], "completed"):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Stock transfer has already been processed")
         
-        if destination_product:
-            # Product exists at destination - update the stock
-            logger.info(f"Found existing product at destination. Adding {transfer.quantity} units to existing stock of {destination_product.stock}")
-            destination_product.stock += transfer.quantity
-        else:
-            # Product doesn't exist at destination - create a new product entry
-            logger.info(f"Creating new product entry at destination for '{source_product.name}'")
-            destination_product = Product(
-                name=source_product.name,
-                description=source_product.description,
-                price=source_product.price,
-                stock=transfer.quantity,
-                category_id=destination_category_id
-            )
-            db.add(destination_product)
-        
-        # Deduct stock from source product
-        logger.info(f"Deducting {transfer.quantity} units from source product {source_product.id} ({source_product.name})")
-        source_product.stock -= transfer.quantity
+        # Move the stock between locator balances. The product keeps a single
+        # row; its total stock does not change when it changes location.
+        logger.info(f"Moving {transfer.quantity} units of product {source_product.id} from locator {transfer.source_location} to {transfer.destination_location}")
+        try:
+            move_stock(db, source_product, transfer.source_location, transfer.destination_location, transfer.quantity)
+        except InsufficientStockError as e:
+            db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Update the transfer status
         transfer.status = "completed"
@@ -406,6 +643,14 @@ async def cancel_stock_transfer(
         if transfer.status == "completed":
             raise HTTPException(status_code=400, detail="Cannot cancel a completed transfer")
         
+        if transfer.status == "merged":
+            raise HTTPException(status_code=400, detail=f"Cannot cancel a merged transfer; cancel transfer {transfer.merged_into_id} instead")
+        
+        # Claim the transfer so it cannot be cancelled after a concurrent completion
+        if not claim_status_change(db, StockTransfer, transfer.id, ["pending", "processing"], "cancelled"):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Stock transfer has already been processed")
+        
         transfer.status = "cancelled"
         transfer.updated_at = datetime.utcnow()
         db.commit()
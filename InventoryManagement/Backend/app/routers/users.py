@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, or_
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import List, Dict, Optional
 from pydantic import BaseModel
 from ..database import get_db
 from ..models.user import User
 from ..schemas.user import User as UserSchema
-from ..utils import get_current_user, verify_password, hash_password
+from ..utils import get_current_user, verify_password_pooled, hash_password_pooled, Principal
 import logging
 
 # Configure logger
@@ -20,35 +21,56 @@ class PasswordChange(BaseModel):
 
 @router.get("/", response_model=List[Dict])
 async def get_users(
+    response: Response,
+    q: Optional[str] = Query(None, min_length=1, max_length=255),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    """
+    List users by id. q matches the start of the email or username (both
+    indexed). Pass limit to page through results; the next page's cursor is
+    returned in the X-Next-Cursor header.
+    """
     # Only admin users can view all users
     if current_user.privileges != 3:
         raise HTTPException(
             status_code=403,
             detail="Not authorized to view user list"
         )
-    
-    users = db.query(User).all()
-    # Log the users being returned
-    logger.info(f"Returning {len(users)} users")
-    for user in users:
-        logger.info(f"User: {user.username}, privileges: {user.privileges}, type: {type(user.privileges)}")
-    
-    # Convert to dictionaries to ensure privileges is properly serialized as an integer
+
+    stmt = select(User.id, User.email, User.username, User.privileges)
+    if q:
+        stmt = stmt.where(or_(User.email.startswith(q, autoescape=True), User.username.startswith(q, autoescape=True)))
+
+    # Keyset pagination on id so deep pages cost the same as the first
+    if cursor:
+        try:
+            after_id = int(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(User.id > after_id)
+
+    stmt = stmt.order_by(User.id)
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        stmt = stmt.limit(limit + 1)
+    rows = db.connection().execute(stmt).all()
+
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    logger.debug(f"Returning {len(rows)} users")
+
+    # Privileges as an integer for the frontend's role comparisons
     return [
-        {
-            "id": user.id,
-            "email": user.email,
-            "username": user.username,
-            "privileges": int(user.privileges)  # Explicitly cast to int
-        }
-        for user in users
+        {"id": id_, "email": email, "username": username, "privileges": int(privileges or 0)}
+        for id_, email, username, privileges in rows
     ]
 
 @router.get("/me", response_model=Dict)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     # Log the current user information for debugging
     logger.info(f"Fetching user info: {current_user.username}, {current_user.email}, {current_user.privileges}")
     
@@ -62,20 +84,28 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Add this new endpoint for password change
 @router.post("/change-password")
-async def change_password(
+def change_password(
     password_data: PasswordChange,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
+    hashed_password = db.query(User.hashed_password).filter(User.id == current_user.id).scalar()
+    if hashed_password is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Don't hold a pooled connection while bcrypt runs
+    db.rollback()
+
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not verify_password_pooled(password_data.current_password, hashed_password):
         raise HTTPException(
             status_code=400,
             detail="Current password is incorrect"
         )
     
-    # Update the password
-    current_user.hashed_password = hash_password(password_data.new_password)
+    # Update the password through the ORM so the user's principal and tokens are invalidated
+    new_hash = hash_password_pooled(password_data.new_password)
+    user = db.query(User).filter(User.id == current_user.id).first()
+    user.hashed_password = new_hash
     db.commit()
     
     return {"message": "Password changed successfully"}
@@ -11,3 +11,6 @@ class ProductBase(BaseModel):
     description: Optional[str] = None
     price: float
     stock: int
+    length: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
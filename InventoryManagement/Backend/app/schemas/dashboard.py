@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Optional
+
+class CategoryCount(BaseModel):
+    name: str
+    products: int
+
+class MonthlyMovement(BaseModel):
+    month: date  # First day of the month
+    qty_in: int
+    qty_out: int
+
+class RecentOrder(BaseModel):
+    id: int
+    type: Optional[str] = None
+    status: Optional[str] = None
+    total: float
+    items: int
+    created_at: Optional[datetime] = None
+
+class DashboardSummary(BaseModel):
+    total_products: int
+    total_stock: int
+    stock_value: float
+    low_stock: int  # In stock but below low_stock_threshold
+    out_of_stock: int
+    low_stock_threshold: int
+    moved_in_last_7_days: int
+    moved_out_last_7_days: int
+    categories: List[CategoryCount]
+    monthly_movements: List[MonthlyMovement]  # Last 6 months, oldest first
+    recent_orders: List[RecentOrder]
+    generated_at: datetime
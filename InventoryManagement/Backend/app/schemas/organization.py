@@ -74,3 +74,19 @@ class Organization(OrganizationBase):
 
     class Config:
         from_attributes = True
+
+class LocatorUtilization(BaseModel):
+    id: int
+    code: str
+    capacity: Optional[float] = None  # length x width x height; None if not measured
+    occupied_volume: float
+    utilization: Optional[float] = None  # occupied / capacity; above 1 is over-full
+
+class SubInventoryUtilization(BaseModel):
+    id: int
+    name: str
+    organization_id: Optional[int] = None
+    capacity: Optional[float] = None  # Sum over measured locators
+    occupied_volume: float
+    utilization: Optional[float] = None
+    locators: List[LocatorUtilization] = []
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional
 from .base import ProductBase, CategoryBase
 
 class ProductCreate(ProductBase):
@@ -12,6 +12,8 @@ class Product(ProductBase):
     updated_at: datetime
     category_id: Optional[int]
     category: Optional[CategoryBase] = None
+    abc_class: Optional[str] = None
+    xyz_class: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -23,7 +25,12 @@ class ProductOut(BaseModel):
     description: Optional[str] = None
     price: float
     stock: int
+    length: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
     category_id: Optional[int] = None
+    abc_class: Optional[str] = None
+    xyz_class: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -32,3 +39,38 @@ class ProductOut(BaseModel):
     
     class Config:
         from_attributes = True  # This is equivalent to orm_mode=True in Pydantic v1
+
+class ProductStockAsOf(BaseModel):
+    product_id: int
+    name: str
+    stock: int
+
+class StockAsOfResponse(BaseModel):
+    at: date  # Stock at the end of this day (UTC)
+    base: str  # 'snapshot' or 'current': where the reconstruction started
+    base_day: Optional[date] = None
+    products: List[ProductStockAsOf]
+
+class ForecastPoint(BaseModel):
+    day: date
+    qty: float
+
+class ProductForecastResponse(BaseModel):
+    product_id: int
+    method: str  # 'ses', 'holt_winters', or 'none' when the product had no sales to fit
+    generated_at: Optional[datetime] = None
+    total: float  # Forecast quantity summed over the horizon
+    forecast: List[ForecastPoint]
+
+class ForecastRunResult(BaseModel):
+    products: int
+    history_days: int
+    horizon_days: int
+    seconds: float
+
+class ClassificationRunResult(BaseModel):
+    products: int
+    window_days: int
+    abc: Dict[str, int]  # Products per class
+    xyz: Dict[str, int]
+    seconds: float
@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class ProductReplenishmentResponse(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None
+    stock: Optional[int] = None
+    avg_daily_demand: float
+    demand_variance: float
+    lead_time_days: float
+    safety_stock: float
+    reorder_point: float
+    needs_reorder: bool  # Stock is at or below the reorder point
+    window_days: int
+    service_level: float
+    computed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ReplenishmentRunResult(BaseModel):
+    products: int
+    window_days: int
+    service_level: float
+    seconds: float
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class StockBalanceResponse(BaseModel):
+    product_id: int
+    product_name: Optional[str] = None
+    locator_id: int
+    locator_code: Optional[str] = None
+    qty: int
+
+    class Config:
+        from_attributes = True
+
+class ProductStockTotal(BaseModel):
+    product_id: int
+    total_qty: int
+    locator_count: int
+
+    class Config:
+        from_attributes = True
@@ -51,6 +51,10 @@ class StockTransferResponse(BaseModel):
     destination_locator_name: Optional[str] = None
     destination_category_name: Optional[str] = None
     
+    # Consolidation audit trail
+    merged_into_id: Optional[int] = None
+    merged_transfer_ids: Optional[str] = None
+    
     # Enhanced relationship representations
     product: Optional[Dict[str, Any]] = None
     source: Optional[Dict[str, Any]] = None
@@ -87,14 +91,25 @@ class StockTransferResponse(BaseModel):
             
         return cls(**data)
 
+class ConsolidatedTransfer(BaseModel):
+    id: int  # The transfer that absorbed the others
+    merged_ids: List[int]
+    quantity: int
+
+class ConsolidationResult(BaseModel):
+    groups: int
+    merged: int
+    transfers: List[ConsolidatedTransfer]
+
 class StockHistoryResponse(BaseModel):
     id: str  # Composite ID for in/out movement
     date: datetime
     quantity: int
     type: str  # 'in' or 'out'
-    location: int  # Locator ID
-    product_id: int
-    transfer_id: int
+    location: Optional[int] = None  # Locator ID
+    product_id: Optional[int] = None  # None for buckets summed over all products
+    transfer_id: Optional[int] = None  # Only set for per-transfer history
+    notes: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -103,3 +118,30 @@ class StockHistoryResponse(BaseModel):
     @classmethod
     def from_dict(cls, data):
         return cls(**data)
+
+class LeadTimePercentiles(BaseModel):
+    # Seconds; None when no transfer in the group reached that stage
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
+
+class TransferLeadTimes(BaseModel):
+    source_location: Optional[int] = None
+    destination_location: Optional[int] = None
+    source_locator_name: Optional[str] = None
+    destination_locator_name: Optional[str] = None
+    transfers: int
+    pending: LeadTimePercentiles  # created -> approved
+    processing: LeadTimePercentiles  # approved -> completed
+    total: LeadTimePercentiles  # created -> completed
+
+class HourlyThroughput(BaseModel):
+    hour: datetime
+    completed: int
+
+class StockTransferStats(BaseModel):
+    start: datetime
+    end: datetime
+    completed: int
+    throughput: List[HourlyThroughput]
+    lead_times: List[TransferLeadTimes]
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models.product import Product
+from .models.stock_movement import StockMovementDaily
+from .models.stock_snapshot import StockSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Past stock is reconstructed from the nearest snapshot plus the daily movement
+# ledger in between, so a query reads at most this many days of ledger rows
+STOCK_SNAPSHOT_INTERVAL_DAYS = int(os.getenv("STOCK_SNAPSHOT_INTERVAL_DAYS", "7"))
+# How often the background task checks whether a snapshot is due
+SNAPSHOT_CHECK_SECONDS = 3600
+
+
+def _net_change(db: Session, *conditions, product_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """Net stock change per product over the ledger days matching the conditions"""
+    movements = StockMovementDaily.__table__
+    net = func.sum(movements.c.qty_in - movements.c.qty_out + movements.c.qty_adjusted)
+    query = select(movements.c.product_id, net).where(*conditions).group_by(movements.c.product_id)
+    if product_ids is not None:
+        query = query.where(movements.c.product_id.in_(list(product_ids)))
+    return {product_id: int(qty or 0) for product_id, qty in db.execute(query)}
+
+
+def _current_stock(db: Session, product_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    products = Product.__table__
+    query = select(products.c.id, products.c.stock)
+    if product_ids is not None:
+        query = query.where(products.c.id.in_(list(product_ids)))
+    return {product_id: stock or 0 for product_id, stock in db.execute(query)}
+
+
+def take_stock_snapshot(db: Session) -> date:
+    """
+    Record every product's stock at the start of today (UTC): the current
+    stock minus today's net change. Replaces an existing snapshot for today.
+    """
+    today = datetime.utcnow().date()
+    movements = StockMovementDaily.__table__
+    stock = _current_stock(db)
+    today_net = _net_change(db, movements.c.day == today)
+
+    snapshots = StockSnapshot.__table__
+    db.execute(delete(snapshots).where(snapshots.c.day == today))
+    if stock:
+        db.execute(insert(snapshots), [
+            {"day": today, "product_id": product_id, "qty": qty - today_net.get(product_id, 0)}
+            for product_id, qty in stock.items()
+        ])
+    logger.info(f"Took stock snapshot for {today} covering {len(stock)} products")
+    return today
+
+
+def snapshot_due(db: Session) -> bool:
+    latest = db.execute(select(func.max(StockSnapshot.day))).scalar()
+    return latest is None or latest <= datetime.utcnow().date() - timedelta(days=STOCK_SNAPSHOT_INTERVAL_DAYS)
+
+
+def stock_as_of(db: Session, day: date, product_ids: Optional[Iterable[int]] = None) -> dict:
+    """
+    Each product's total stock at the end of the given day.
+
+    Starts from whichever is closest to the day: the latest snapshot on or
+    before it (rolled forward), the earliest snapshot after it, or the current
+    stock (both rolled back). Only ledger rows between the two are read.
+    """
+    movements = StockMovementDaily.__table__
+    today = datetime.utcnow().date()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+
+    if day >= today:
+        return {"base": "current", "base_day": None, "stock": _current_stock(db, product_ids)}
+
+    before = db.execute(select(func.max(StockSnapshot.day)).where(StockSnapshot.day <= day)).scalar()
+    after = db.execute(select(func.min(StockSnapshot.day)).where(StockSnapshot.day > day)).scalar()
+
+    # Ledger days each option has to read; "current" acts as a snapshot taken tomorrow
+    options = [((today - day).days, "current", None)]
+    if before is not None:
+        options.append(((day - before).days + 1, "snapshot", before))
+    if after is not None:
+        options.append(((after - day).days - 1, "snapshot", after))
+    _, base, base_day = min(options, key=lambda option: option[0])
+
+    if base_day is None:
+        stock = _current_stock(db, product_ids)
+        net = _net_change(db, movements.c.day > day, product_ids=product_ids)
+        sign = -1
+    else:
+        snapshots = StockSnapshot.__table__
+        query = select(snapshots.c.product_id, snapshots.c.qty).where(snapshots.c.day == base_day)
+        if product_ids is not None:
+            query = query.where(snapshots.c.product_id.in_(product_ids))
+        stock = {product_id: qty for product_id, qty in db.execute(query)}
+        if base_day <= day:
+            net = _net_change(db, movements.c.day >= base_day, movements.c.day <= day, product_ids=product_ids)
+            sign = 1
+        else:
+            net = _net_change(db, movements.c.day > day, movements.c.day < base_day, product_ids=product_ids)
+            sign = -1
+
+    for product_id, change in net.items():
+        stock[product_id] = stock.get(product_id, 0) + sign * change
+    return {"base": base, "base_day": base_day, "stock": stock}
+
+
+def _snapshot_if_due():
+    db = SessionLocal()
+    try:
+        if snapshot_due(db):
+            take_stock_snapshot(db)
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Stock snapshot failed: {e}")
+    finally:
+        db.close()
+
+
+async def run_snapshot_schedule():
+    """Background task: take a snapshot whenever the last one is older than the interval"""
+    while True:
+        await asyncio.to_thread(_snapshot_if_due)
+        await asyncio.sleep(SNAPSHOT_CHECK_SECONDS)
+
+
+if __name__ == "__main__":
+    # For cron: python -m app.snapshots
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    session = SessionLocal()
+    try:
+        take_stock_snapshot(session)
+        session.commit()
+    finally:
+        session.close()
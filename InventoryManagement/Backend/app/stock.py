@@ -0,0 +1,365 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+import logging
+from .models.product import Product
+from .models.category import Category
+from .models.organization import Locator
+from .models.stock_balance import StockBalance
+from .models.stock_movement import StockMovementDaily, UNASSIGNED_LOCATOR
+
+logger = logging.getLogger(__name__)
+
+# Product.stock is the total on hand for a product. stock_balances records how
+# much of it sits at each locator; stock that cannot be attributed to a locator
+# (e.g. rows created before balances existed) is "unplaced" until a transfer
+# moves it.
+#
+# All stock changes go through this module as single conditional UPDATEs
+# (... SET stock = stock - :q WHERE ... AND stock >= :q). The database checks
+# and applies the change in one statement, so concurrent requests cannot
+# oversell and no row is locked while Python code decides what to write. The
+# one exception is placing unplaced stock, which locks the product row (see
+# place_unplaced_stock).
+#
+# Every change is also added to the stock_movement_daily rollup: transfers and
+# order approvals as movements, which history queries read instead of scanning
+# every transfer, and other changes as adjustments, so the rollup is a complete
+# ledger for reconstructing past stock (see snapshots.py).
+#
+# Each balance change also adds qty x unit volume to its locator's
+# occupied_volume, so space utilization never needs a scan of the balances.
+
+
+class InsufficientStockError(Exception):
+    """Raised when a stock mutation would take more than is available"""
+
+    def __init__(self, product_id: int, requested: int, available: int, locator_id: Optional[int] = None):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        self.locator_id = locator_id
+        where = f" at locator {locator_id}" if locator_id is not None else ""
+        super().__init__(f"Insufficient stock{where}. Requested: {requested}, Available: {available}")
+
+
+def upsert_increment(db: Session, table, key: dict, increments: dict):
+    """
+    Insert a row, or atomically add the increments to it if a row with the same
+    key already exists. The key columns must be covered by a unique index.
+    """
+    values = {**key, **increments}
+    if db.get_bind().dialect.name == "mysql":
+        stmt = mysql_insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            {column: table.c[column] + stmt.inserted[column] for column in increments}
+        )
+    else:
+        stmt = sqlite_insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[column] for column in key],
+            set_={column: table.c[column] + stmt.excluded[column] for column in increments}
+        )
+    db.execute(stmt)
+
+
+def unit_volume():
+    """SQL expression for a product's unit volume, 0 when a dimension is missing"""
+    products = Product.__table__
+    return func.coalesce(products.c.length * products.c.width * products.c.height, 0)
+
+
+def occupy_space(db: Session, product_id: int, locator_id: int, delta: int):
+    """Add delta units of a product's volume to a locator's occupied volume"""
+    products = Product.__table__
+    locators = Locator.__table__
+    volume = select(unit_volume()).where(products.c.id == product_id).scalar_subquery()
+    db.execute(
+        update(locators)
+        .where(locators.c.id == locator_id)
+        .values(occupied_volume=func.coalesce(locators.c.occupied_volume, 0) + delta * func.coalesce(volume, 0))
+    )
+
+
+def resize_product(db: Session, product_id: int, old_volume: float, new_volume: float):
+    """
+    Re-book the space a product takes at every locator holding it after its
+    unit volume changed (new_volume 0 when the product is deleted)
+    """
+    if old_volume == new_volume:
+        return
+    balances = StockBalance.__table__
+    locators = Locator.__table__
+    held = (
+        select(balances.c.qty)
+        .where(balances.c.product_id == product_id, balances.c.locator_id == locators.c.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(locators)
+        .where(locators.c.id.in_(select(balances.c.locator_id).where(balances.c.product_id == product_id)))
+        .values(occupied_volume=func.coalesce(locators.c.occupied_volume, 0) + (new_volume - old_volume) * held)
+    )
+
+
+def rebuild_occupied_volume(db: Session):
+    """Recompute every locator's occupied volume from the balances (backfill, drift repair)"""
+    balances = StockBalance.__table__
+    locators = Locator.__table__
+    products = Product.__table__
+    occupied = (
+        select(func.sum(balances.c.qty * unit_volume()))
+        .select_from(balances.join(products, products.c.id == balances.c.product_id))
+        .where(balances.c.locator_id == locators.c.id)
+        .scalar_subquery()
+    )
+    db.execute(update(locators).values(occupied_volume=func.coalesce(occupied, 0)))
+
+
+def product_volume(product: Product) -> float:
+    if product.length is None or product.width is None or product.height is None:
+        return 0.0
+    return product.length * product.width * product.height
+
+
+def adjust_balance(db: Session, product_id: int, locator_id: int, delta: int):
+    """Add delta to the balance of a product at a locator, creating the row if needed"""
+    if not locator_id or not delta:
+        return
+    if delta < 0:
+        # Decrements are conditional so a balance never goes negative
+        take_balance(db, product_id, locator_id, -delta)
+        return
+    upsert_increment(
+        db,
+        StockBalance.__table__,
+        {"product_id": product_id, "locator_id": locator_id},
+        {"qty": delta}
+    )
+    occupy_space(db, product_id, locator_id, delta)
+
+
+def take_balance(db: Session, product_id: int, locator_id: int, quantity: int):
+    """Atomically remove quantity from a balance, failing if the balance is too small"""
+    balances = StockBalance.__table__
+    result = db.execute(
+        update(balances)
+        .where(
+            balances.c.product_id == product_id,
+            balances.c.locator_id == locator_id,
+            balances.c.qty >= quantity
+        )
+        .values(qty=balances.c.qty - quantity)
+    )
+    if result.rowcount != 1:
+        raise InsufficientStockError(product_id, quantity, get_balance(db, product_id, locator_id), locator_id)
+    occupy_space(db, product_id, locator_id, -quantity)
+
+
+def get_balance(db: Session, product_id: int, locator_id: int) -> int:
+    qty = db.execute(
+        select(StockBalance.qty).where(
+            StockBalance.product_id == product_id,
+            StockBalance.locator_id == locator_id
+        )
+    ).scalar()
+    return qty or 0
+
+
+def home_locator_id(db: Session, product: Product) -> Optional[int]:
+    """The locator of the product's category, where untracked movements are booked"""
+    if not product.category_id:
+        return None
+    return db.execute(
+        select(Category.locator_id).where(Category.id == product.category_id)
+    ).scalar()
+
+
+def stock_in_category(db: Session, category_id: int) -> dict:
+    """
+    Stock held in a category by product id: the balances at its locator plus,
+    for products whose home is the category, stock not yet attributed to a
+    locator. Without a locator every unit of its products counts.
+    """
+    locator_id = db.execute(select(Category.locator_id).where(Category.id == category_id)).scalar()
+    if not locator_id:
+        rows = db.execute(select(Product.id, Product.stock).where(Product.category_id == category_id)).all()
+        return {product_id: stock or 0 for product_id, stock in rows}
+
+    placed = (
+        select(StockBalance.product_id, func.sum(StockBalance.qty).label("qty"))
+        .group_by(StockBalance.product_id)
+        .subquery()
+    )
+    home = db.execute(
+        select(Product.id, Product.stock - func.coalesce(placed.c.qty, 0))
+        .outerjoin(placed, placed.c.product_id == Product.id)
+        .where(Product.category_id == category_id)
+    ).all()
+    held = {product_id: max(unplaced or 0, 0) for product_id, unplaced in home}
+    for product_id, qty in db.execute(
+        select(StockBalance.product_id, StockBalance.qty).where(StockBalance.locator_id == locator_id, StockBalance.qty > 0)
+    ):
+        held[product_id] = held.get(product_id, 0) + qty
+    return held
+
+
+def place_unplaced_stock(db: Session, product: Product, locator_id: int):
+    """
+    Book any stock not yet attributed to a locator at the given locator.
+
+    The unplaced quantity is computed from two reads, so the product row is
+    locked first (SELECT ... FOR UPDATE; SQLite's BEGIN IMMEDIATE already
+    serializes writers). Two transfers of the same product completing at once
+    would otherwise both see the same unplaced stock and place it twice.
+    """
+    total = db.execute(
+        select(Product.stock).where(Product.id == product.id).with_for_update()
+    ).scalar() or 0
+    placed = db.execute(
+        select(func.coalesce(func.sum(StockBalance.qty), 0)).where(StockBalance.product_id == product.id)
+    ).scalar()
+    unplaced = total - placed
+    if unplaced > 0:
+        logger.info(f"Placing {unplaced} unplaced units of product {product.id} at locator {locator_id}")
+        adjust_balance(db, product.id, locator_id, unplaced)
+
+
+def take_stock(db: Session, product: Product, quantity: int):
+    """
+    Remove quantity of a product from where it is actually held: stock not yet
+    attributed to a locator first, then each locator holding some in locator id
+    order. Returns the (locator_id, qty) taken, None for unplaced stock.
+
+    Each balance is taken with a conditional UPDATE, so a balance changed by a
+    concurrent request raises InsufficientStockError instead of going negative,
+    as does a quantity the balances cannot cover. Product.stock must already
+    include the decrement.
+    """
+    balances = db.execute(
+        select(StockBalance.locator_id, StockBalance.qty)
+        .where(StockBalance.product_id == product.id, StockBalance.qty > 0)
+        .order_by(StockBalance.locator_id)
+    ).all()
+    placed = sum(qty for _, qty in balances)
+    total = db.execute(select(Product.stock).where(Product.id == product.id)).scalar() or 0
+    unplaced = max(total + quantity - placed, 0)
+
+    taken = []
+    remaining = quantity
+    if unplaced:
+        taken.append((None, min(unplaced, remaining)))
+        remaining -= taken[-1][1]
+    for locator_id, qty in balances:
+        if not remaining:
+            break
+        take = min(qty, remaining)
+        take_balance(db, product.id, locator_id, take)
+        taken.append((locator_id, take))
+        remaining -= take
+    if remaining:
+        raise InsufficientStockError(product.id, quantity, quantity - remaining)
+    return taken
+
+
+def record_movement(db: Session, product_id: int, locator_id: Optional[int], delta: int):
+    """Add a movement (positive in, negative out) to today's rollup row"""
+    if not delta:
+        return
+    upsert_increment(
+        db,
+        StockMovementDaily.__table__,
+        {"day": datetime.utcnow().date(), "product_id": product_id, "locator_id": locator_id or UNASSIGNED_LOCATOR},
+        {"qty_in": max(delta, 0), "qty_out": max(-delta, 0)}
+    )
+
+
+def record_adjustment(db: Session, product_id: int, locator_id: Optional[int], delta: int):
+    """Add a change that is not a movement (initial stock, correction) to today's rollup row"""
+    if not delta:
+        return
+    upsert_increment(
+        db,
+        StockMovementDaily.__table__,
+        {"day": datetime.utcnow().date(), "product_id": product_id, "locator_id": locator_id or UNASSIGNED_LOCATOR},
+        {"qty_adjusted": delta}
+    )
+
+
+def record_stock_change(db: Session, product: Product, delta: int):
+    """
+    Book a change already made to a product's total stock (e.g. the initial
+    stock of a new product) at its home locator
+    """
+    locator_id = home_locator_id(db, product)
+    adjust_balance(db, product.id, locator_id, delta)
+    record_adjustment(db, product.id, locator_id, delta)
+
+
+def change_stock(db: Session, product: Product, delta: int, movement: bool = True):
+    """
+    Atomically add delta to a product's total stock. An increment is booked at
+    the product's home locator, a decrement is taken from the locators that
+    hold the stock (see take_stock).
+
+    A decrement only applies if the stock on hand covers it when the UPDATE
+    runs; otherwise InsufficientStockError is raised and the caller rolls back.
+    Pass movement=False for corrections that should not show up in history;
+    they are recorded as adjustments instead.
+    """
+    if not delta:
+        return
+    products = Product.__table__
+    stmt = update(products).where(products.c.id == product.id).values(
+        stock=func.coalesce(products.c.stock, 0) + delta
+    )
+    if delta < 0:
+        stmt = stmt.where(products.c.stock >= -delta)
+    if db.execute(stmt).rowcount != 1:
+        available = db.execute(select(products.c.stock).where(products.c.id == product.id)).scalar()
+        raise InsufficientStockError(product.id, -delta, available or 0)
+
+    # The loaded value is stale now; reload it on next access
+    db.expire(product, ["stock"])
+    if delta > 0:
+        locator_id = home_locator_id(db, product)
+        adjust_balance(db, product.id, locator_id, delta)
+        changes = [(locator_id, delta)]
+    else:
+        changes = [(locator_id, -qty) for locator_id, qty in take_stock(db, product, -delta)]
+
+    record = record_movement if movement else record_adjustment
+    for locator_id, qty in changes:
+        record(db, product.id, locator_id, qty)
+
+
+def claim_status_change(db: Session, model, row_id: int, from_statuses, to_status: str) -> bool:
+    """
+    Atomically move a row (order, stock transfer) to to_status if it is still in
+    one of from_statuses. Returns False if another request got there first, so
+    the same order or transfer can never apply its stock change twice.
+
+    Callers still set the attribute on the loaded object so the flush records
+    the change (event stream, transition log) as usual.
+    """
+    table = model.__table__
+    result = db.execute(
+        update(table)
+        .where(table.c.id == row_id, table.c.status.in_(list(from_statuses)))
+        .values(status=to_status)
+    )
+    return result.rowcount == 1
+
+
+def move_stock(db: Session, product: Product, source_locator_id: int, destination_locator_id: int, quantity: int):
+    """
+    Move stock between locators. The product's total stock is unchanged.
+    """
+    place_unplaced_stock(db, product, source_locator_id)
+    take_balance(db, product.id, source_locator_id, quantity)
+    adjust_balance(db, product.id, destination_locator_id, quantity)
+    record_movement(db, product.id, source_locator_id, -quantity)
+    record_movement(db, product.id, destination_locator_id, quantity)
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends
-from .utils import get_current_user
-from .models import User
+from .utils import get_current_user, Principal
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 @router.get("/me")
-def get_profile(user: User = Depends(get_current_user)):
+def get_profile(user: Principal = Depends(get_current_user)):
     return {
         "email": user.email,
         "username": user.username,
@@ -13,5 +12,5 @@ def get_profile(user: User = Depends(get_current_user)):
     }
 
 @router.get("/protected")
-def protected(user: User = Depends(get_current_user)):
+def protected(user: Principal = Depends(get_current_user)):
     return {"message": f"Hello {user.username}, you are authenticated"}
@@ -1,24 +1,68 @@
-from passlib.hash import bcrypt as passlib_bcrypt
+from passlib.hash import argon2 as passlib_argon2
 from passlib.context import CryptContext
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import event, inspect
+from .database import SessionLocal, ReadSessionLocal
 from .models import User  # Fix the import to use relative path
+import anyio
+import asyncio
+import logging
 import os
+import threading
+import time
 
-# Update password context to use specific bcrypt version
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12  # Explicitly set rounds
-)
+logger = logging.getLogger(__name__)
+
+# Password hashing policy. Hashes made with another scheme or cost still
+# verify and are replaced on the user's next successful login. Use
+# benchmarks/tune_password_hash.py to pick a cost for the target latency.
+PASSWORD_SCHEME = os.getenv("PASSWORD_SCHEME", "bcrypt")  # bcrypt or argon2
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "19456"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+def build_password_context(
+    scheme: str = PASSWORD_SCHEME,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM
+) -> CryptContext:
+    if scheme not in ("bcrypt", "argon2"):
+        raise ValueError(f"Unknown password scheme: {scheme}")
+    if scheme == "argon2" and not passlib_argon2.has_backend():
+        # argon2 needs the optional argon2-cffi package
+        logger.warning("PASSWORD_SCHEME=argon2 but argon2-cffi is not installed; using bcrypt")
+        scheme = "bcrypt"
+    return CryptContext(
+        schemes=["bcrypt", "argon2"],
+        default=scheme,
+        deprecated="auto",
+        # Pin the cost both ways so hashes with any other cost are rehashed
+        bcrypt__default_rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+pwd_context = build_password_context()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+ACCESS_TOKEN_MINUTES = 15
+# Opt-in: build the principal from the token's signed claims without any
+# database access; revocation is then per process (see revoked_tokens)
+STATELESS_AUTH = os.getenv("STATELESS_AUTH", "false").lower() in ("1", "true", "yes")
+
 # Hash a password
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -27,9 +71,103 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also return a new hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PasswordHashPool:
+    """
+    Bounded executor for password hashing and verification.
+
+    bcrypt releases the GIL, so a few worker threads keep a burst of logins
+    off the event loop without starving the default thread pool used by
+    other endpoints. At most max_pending operations may be running or
+    waiting; beyond that requests are turned away with 503 instead of
+    queueing without bound. workers=0 runs them inline (for comparison).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") if workers > 0 else None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _call(self, submitted_at: float, fn, args):
+        waited = time.monotonic() - submitted_at
+        with self._lock:
+            self._running += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many concurrent password operations, please retry",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            self._max_queued = max(self._max_queued, self._pending - self._running)
+        try:
+            if self._executor is None:
+                return self._call(time.monotonic(), fn, args)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._call, time.monotonic(), fn, args
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_total / self._completed * 1000 if self._completed else 0.0,
+                "max_wait_ms": self._wait_max * 1000,
+            }
+
+
+password_pool = PasswordHashPool(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+)
+
+# For sync routes, which FastAPI runs on its threadpool: hand the work to the
+# password pool through the event loop and wait for it on this thread
+def run_on_password_pool(fn, *args):
+    return anyio.from_thread.run(password_pool.run, fn, *args)
+
+def hash_password_pooled(password: str) -> str:
+    return run_on_password_pool(hash_password, password)
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    return run_on_password_pool(verify_password, plain_password, hashed_password)
+
 def create_access_token(data: Dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=15)
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, os.getenv("JWT_SECRET_KEY"), algorithm="HS256")
 
@@ -39,6 +177,16 @@ def create_refresh_token(data: Dict) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, os.getenv("JWT_REFRESH_SECRET_KEY"), algorithm="HS256")
 
+def token_claims(user: User) -> Dict:
+    """Token data identifying a user, enough to build its principal in stateless mode"""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.username,
+        "privileges": user.privileges,
+        "ver": user.token_version or 0
+    }
+
 def verify_token(token: str, secret_key: str) -> Optional[Dict]:
     try:
         payload = jwt.decode(token, secret_key, algorithms=["HS256"])
@@ -46,10 +194,152 @@ def verify_token(token: str, secret_key: str) -> Optional[Dict]:
     except JWTError:
         return None
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+class Principal:
+    """
+    The authenticated user as routes see it: identity and privileges only.
+    Routes that need the full row (e.g. to change the password) load it by id.
+    """
+    __slots__ = ("id", "email", "username", "privileges")
+
+    def __init__(self, id: int, email: str, username: Optional[str], privileges: Optional[int]):
+        self.id = id
+        self.email = email
+        self.username = username
+        self.privileges = privileges
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.id, user.email, user.username, user.privileges)
+
+    @classmethod
+    def from_claims(cls, payload: Dict) -> Optional["Principal"]:
+        """None for tokens issued without the principal claims"""
+        if payload.get("uid") is None or "ver" not in payload:
+            return None
+        return cls(payload["uid"], payload["sub"], payload.get("name"), payload.get("privileges"))
+
+
+class PrincipalCache:
+    """
+    Per-process TTL/LRU cache of principals keyed by token subject (email).
+
+    Entries are evicted when the user row is updated or deleted through the
+    ORM in this process; the TTL bounds how long other processes, or raw SQL
+    changes, can go unnoticed.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return principal
+
+    def put(self, subject: str, principal: Principal):
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: Optional[str] = None):
+        with self._lock:
+            if subject is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(subject, None)
+
+
+class RevokedTokens:
+    """
+    (user id, token version) pairs revoked in this process.
+
+    An access token expires ACCESS_TOKEN_MINUTES after it is issued, so a pair
+    only has to be remembered that long and the set stays small.
+    """
+
+    def __init__(self, retention_seconds: float):
+        self.retention_seconds = retention_seconds
+        self._revoked: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, user_id: int, version: int):
+        now = time.monotonic()
+        with self._lock:
+            self._revoked = {
+                key: revoked_at for key, revoked_at in self._revoked.items()
+                if now - revoked_at < self.retention_seconds
+            }
+            self._revoked[(user_id, version)] = now
+
+    def is_revoked(self, user_id: int, version: int) -> bool:
+        return (user_id, version) in self._revoked
+
+
+revoked_tokens = RevokedTokens(retention_seconds=ACCESS_TOKEN_MINUTES * 60)
+
+principal_cache = PrincipalCache(
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60")),
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+)
+
+
+# Token revocations and principal evictions are collected during flush and
+# applied once the transaction commits, like the status events in events.py:
+# a rolled back change must not log anyone out, and an eviction before the
+# commit lets a concurrent request cache the old row again.
+def _apply_on_commit(target, key: str, *items):
+    inspect(target).session.info.setdefault(key, set()).update(items)
+
+
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.hashed_password.history.has_changes() or state.attrs.privileges.history.has_changes():
+        old_version = target.token_version or 0
+        target.token_version = old_version + 1
+        _apply_on_commit(target, "revoked_tokens", (target.id, old_version))
+
+
+@event.listens_for(User, "after_delete")
+def _revoke_deleted_user(mapper, connection, target):
+    _apply_on_commit(target, "revoked_tokens", (target.id, target.token_version or 0))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_principal(mapper, connection, target):
+    # Password, privilege and email changes all go through here; evict the old
+    # email too when it changed
+    history = inspect(target).attrs.email.history
+    _apply_on_commit(target, "evicted_principals", *[email for email in [target.email, *(history.deleted or ())] if email])
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_user_changes(session):
+    for user_id, version in session.info.pop("revoked_tokens", ()):
+        revoked_tokens.revoke(user_id, version)
+    for email in session.info.pop("evicted_principals", ()):
+        principal_cache.invalidate(email)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_user_changes(session):
+    session.info.pop("revoked_tokens", None)
+    session.info.pop("evicted_principals", None)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -68,9 +358,29 @@ async def get_current_user(
             
     except JWTError:
         raise credentials_exception
-        
-    user = db.query(User).filter(User.email == email).first()
+
+    if STATELESS_AUTH:
+        principal = Principal.from_claims(payload)
+        if principal is not None:
+            if revoked_tokens.is_revoked(principal.id, payload["ver"]):
+                raise credentials_exception
+            return principal
+        # Older tokens without the claims fall through to the lookup below
+
+    principal = principal_cache.get(email)
+    if principal is not None:
+        return principal
+
+    # Cache miss: a short-lived session of our own, so routes that only need
+    # the principal never open one
+    db = ReadSessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+    finally:
+        db.close()
     if user is None:
         raise credentials_exception
-        
-    return user
+
+    principal = Principal.from_user(user)
+    principal_cache.put(email, principal)
+    return principal
@@ -0,0 +1,134 @@
+"""
+Requests per second of GET /products/ on the sync session versus the async session.
+
+Runs the app in-process (httpx ASGI transport) against a throwaway SQLite
+database, or the database given with --url, at each concurrency level. The
+sync case is the handler as it was before the move to AsyncSession, mounted
+next to the real route. Its pool is sized to the concurrency: with the app's
+10 + 20 the blocked event loop never gets to release connections and the run
+stalls on pool checkout.
+
+    python benchmarks/bench_async_sessions.py --concurrency 50 500
+    python benchmarks/bench_async_sessions.py --url mysql+pymysql://user:pw@host/db
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+os.environ.setdefault("JWT_REFRESH_SECRET_KEY", "bench-refresh-secret")
+# Measure the sessions, not the per-client limits on /products
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx
+import numpy as np
+from fastapi import Depends
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, joinedload
+
+from app.database import Base, get_db, get_async_db, async_database_url
+from app.main import app
+from app.models import customer, organization  # noqa: F401 - register tables
+from app.models.category import Category
+from app.models.product import Product
+
+
+@app.get("/bench/products-sync", include_in_schema=False)
+async def get_products_sync(db: Session = Depends(get_db)):
+    # GET /products/ before it moved to AsyncSession: the query blocks the event loop
+    return db.query(Product).options(joinedload(Product.category)).all()
+
+
+def seed(engine, products):
+    with sessionmaker(bind=engine)() as db:
+        categories = [Category(name=f"Category {i}", description="bench") for i in range(10)]
+        db.add_all(categories)
+        db.flush()
+        db.add_all([
+            Product(name=f"Product {i}", description="bench", price=9.99, stock=i % 50, category_id=categories[i % 10].id)
+            for i in range(products)
+        ])
+        db.commit()
+
+
+async def load(path, concurrency, requests):
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None)
+    latencies = []
+    remaining = requests
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies = np.array(latencies) * 1000
+    return requests / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+async def run(concurrency_levels, requests, async_engine):
+    # One event loop for every run; the async pool is bound to it
+    for concurrency in concurrency_levels:
+        for label, path in (("sync session", "/bench/products-sync"), ("async session", "/products/")):
+            rps, p50, p99 = await load(path, concurrency, requests)
+            print(f"{concurrency:4} clients  {label:14} {rps:8.1f} req/s  p50 {p50:8.1f} ms  p99 {p99:8.1f} ms")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="sync database URL to use instead of a temporary SQLite file")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, pool_size=max(args.concurrency), max_overflow=0)
+        # The app's pool: waiting for a connection no longer blocks the event loop
+        async_engine = create_async_engine(async_database_url(url), pool_size=10, max_overflow=20)
+        if not args.url:
+            Base.metadata.create_all(bind=engine)
+            seed(engine, args.products)
+
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+        async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        def bench_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        async def bench_async_db():
+            async with async_session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = bench_db
+        app.dependency_overrides[get_async_db] = bench_async_db
+        # The app logs every request at DEBUG
+        logging.disable(logging.INFO)
+
+        asyncio.run(run(args.concurrency, args.requests, async_engine))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Time the demand forecaster's fits in one process and across a process pool.
+
+Fits synthetic daily sell quantities, so no database is needed:
+
+    python benchmarks/bench_forecasting.py --products 10000 100000 --workers 1 4
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.forecasting import forecast_series, forecast_chunk, start_forecast_pool, FORECAST_HISTORY_DAYS, FORECAST_HORIZON_DAYS
+
+
+def demand(products, days, seed=0):
+    """Poisson demand with a per-product rate and weekly pattern"""
+    rng = np.random.default_rng(seed)
+    rate = rng.gamma(2.0, 3.0, size=(products, 1))
+    weekly = 1 + 0.5 * np.sin(2 * np.pi * (np.arange(days) + rng.integers(0, 7, size=(products, 1))) / 7)
+    return rng.poisson(rate * weekly).astype(np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--days", type=int, default=FORECAST_HISTORY_DAYS)
+    args = parser.parse_args()
+
+    for products in args.products:
+        y = demand(products, args.days)
+        baseline = None
+        for workers in args.workers:
+            pool = start_forecast_pool(workers)
+            if pool:
+                # Time the fits, not the start of the spawned workers, as in the app
+                list(pool.map(forecast_chunk, [y[:1]] * workers, [1] * workers))
+            started = time.perf_counter()
+            forecasts, use_hw = forecast_series(y, FORECAST_HORIZON_DAYS, pool)
+            elapsed = time.perf_counter() - started
+            if pool:
+                pool.shutdown()
+            baseline = baseline or elapsed
+            print(
+                f"{products:,} products x {args.days} days, {workers} worker(s): {elapsed:.2f}s "
+                f"({baseline / elapsed:.1f}x, {use_hw.mean():.0%} Holt-Winters)"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Latency of unrelated endpoints while a burst of logins is being verified.
+
+Fires concurrent logins at the app in-process (httpx ASGI transport, throwaway
+SQLite database) while another task keeps calling GET /, once with bcrypt run
+inline on the event loop and once through the password hashing pool:
+
+    python benchmarks/bench_login_storm.py --logins 100
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+os.environ.setdefault("JWT_REFRESH_SECRET_KEY", "bench-refresh-secret")
+
+import httpx
+import numpy as np
+from passlib.hash import bcrypt
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import auth
+from app.database import Base, get_db
+from app.main import app
+from app.models import category, customer, organization  # noqa: F401 - register tables
+from app.models.user import User
+from app.utils import PasswordHashPool
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+async def probe(client, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+
+async def storm(logins, workers):
+    auth.password_pool = PasswordHashPool(workers=workers, max_pending=max(logins, 1))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        stop = asyncio.Event()
+        latencies = []
+        prober = asyncio.create_task(probe(client, stop, latencies))
+        started = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD, "isAdmin": False})
+            for _ in range(logins)
+        ])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    ok = sum(response.status_code == 200 for response in responses)
+    latencies = np.array(latencies) * 1000
+    label = "inline" if workers == 0 else f"pool ({workers} workers)"
+    print(
+        f"{label:18} {ok}/{logins} logins in {elapsed:.2f}s | GET / during storm: "
+        f"{len(latencies)} calls, p50 {np.percentile(latencies, 50):.1f} ms, "
+        f"p99 {np.percentile(latencies, 99):.1f} ms, max {latencies.max():.1f} ms"
+    )
+    print(f"{'':18} pool metrics: {auth.password_pool.metrics()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            db.add(User(email=EMAIL, username="bench", hashed_password=bcrypt.hash(PASSWORD), privileges=1))
+            db.commit()
+
+        def bench_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = bench_db
+        # The app logs every request at DEBUG
+        logging.disable(logging.INFO)
+        asyncio.run(storm(args.logins, 0))
+        asyncio.run(storm(args.logins, args.workers))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
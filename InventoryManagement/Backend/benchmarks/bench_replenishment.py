@@ -0,0 +1,93 @@
+"""
+Time the replenishment job over a large catalog.
+
+Runs against a throwaway SQLite database so no MySQL server is needed:
+
+    python benchmarks/bench_replenishment.py --products 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import category, customer, organization, user  # noqa: F401 - register tables
+from app.models.product import Product
+from app.models.order import Order, OrderItem
+from app.models.stock_movement import StockMovementDaily
+from app.replenishment import compute_replenishment
+
+BATCH = 50000
+
+
+def seed(engine, products, window_days, demand_probability, purchase_orders):
+    rng = np.random.default_rng(1)
+    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [
+            {"id": i, "name": f"Product {i}", "price": 10.0, "stock": int(rng.integers(0, 500))}
+            for i in range(1, products + 1)
+        ])
+
+        # Sparse daily demand: each product sells on a fraction of the days
+        product_ids, days = np.nonzero(rng.random((products, window_days)) < demand_probability)
+        quantities = rng.integers(1, 20, len(product_ids))
+        rows = [
+            {"day": today - timedelta(days=int(day)), "product_id": int(pid) + 1, "locator_id": 0,
+             "qty_in": 0, "qty_out": int(qty)}
+            for pid, day, qty in zip(product_ids, days, quantities)
+        ]
+        for offset in range(0, len(rows), BATCH):
+            conn.execute(insert(StockMovementDaily.__table__), rows[offset:offset + BATCH])
+
+        conn.execute(insert(Order.__table__), [
+            {"id": i, "order_type": "purchase", "status": "completed",
+             "created_at": now - timedelta(days=int(rng.integers(2, 30))), "updated_at": now - timedelta(days=1)}
+            for i in range(1, purchase_orders + 1)
+        ])
+        conn.execute(insert(OrderItem.__table__), [
+            {"order_id": i, "product_id": int(rng.integers(1, products + 1)), "quantity": 10, "price": 10.0}
+            for i in range(1, purchase_orders + 1)
+        ])
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--window-days", type=int, default=90)
+    parser.add_argument("--demand-probability", type=float, default=0.1)
+    parser.add_argument("--purchase-orders", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        demand_rows = seed(engine, args.products, args.window_days, args.demand_probability, args.purchase_orders)
+        session_factory = sessionmaker(bind=engine)
+
+        db = session_factory()
+        started = time.perf_counter()
+        written = compute_replenishment(db, window_days=args.window_days)
+        db.commit()
+        elapsed = time.perf_counter() - started
+        db.close()
+        engine.dispose()
+
+    print(f"products:      {args.products:,}")
+    print(f"demand rows:   {demand_rows:,} (product, day) totals over {args.window_days} days")
+    print(f"purchase rows: {args.purchase_orders:,}")
+    print(f"job:           {elapsed:.2f}s including the write of {written:,} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare the Python and NumPy engines of GET /products/{id}/history.
+
+Runs against a throwaway SQLite database so no MySQL server is needed:
+
+    python benchmarks/bench_stock_history.py --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import category, customer, organization  # noqa: F401 - register tables
+from app.models.product import Product
+from app.models.stock_transfer import StockTransfer
+from app.schemas.stock_transfer import StockHistoryResponse
+from app.routers.products import product_history_items, product_history_json
+
+PRODUCT_ID = 1
+BATCH = 50000
+
+
+def seed(engine, rows):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [{"id": PRODUCT_ID, "name": "Product", "price": 10.0, "stock": 1000}])
+        for offset in range(0, rows, BATCH):
+            conn.execute(insert(StockTransfer.__table__), [
+                {
+                    "product_id": PRODUCT_ID,
+                    "source_location": random.choice([1, 2, None]),
+                    "destination_location": random.choice([3, 4]),
+                    "quantity": random.randint(1, 50),
+                    "status": "completed",
+                    # Spread over the default 180-day window, some with microseconds
+                    "created_at": now - timedelta(seconds=i * 15_000_000 // rows, microseconds=i % 3),
+                    "source_locator_name": random.choice(["A-01", None]),
+                    "destination_locator_name": "B-01",
+                }
+                for i in range(offset, min(offset + BATCH, rows))
+            ])
+
+
+def python_engine(db, start):
+    items = product_history_items(db, PRODUCT_ID, start, None)
+    # What FastAPI does with response_model=List[StockHistoryResponse]
+    adapter = TypeAdapter(List[StockHistoryResponse])
+    return adapter.dump_json(adapter.validate_python(items))
+
+
+def numpy_engine(db, start):
+    return product_history_json(db, PRODUCT_ID, start, None)
+
+
+def numpy_columnar(db, start):
+    return product_history_json(db, PRODUCT_ID, start, None, columnar=True)
+
+
+def best_of(fn, session_factory, start, repeat):
+    timings = []
+    for _ in range(repeat):
+        db = session_factory()
+        started = time.perf_counter()
+        body = fn(db, start)
+        timings.append(time.perf_counter() - started)
+        db.close()
+    return min(timings), body
+
+
+def run(rows, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, rows)
+        session_factory = sessionmaker(bind=engine)
+        start = datetime.now() - timedelta(days=180)
+
+        py_time, py_body = best_of(python_engine, session_factory, start, repeat)
+        np_time, np_body = best_of(numpy_engine, session_factory, start, repeat)
+        col_time, col_body = best_of(numpy_columnar, session_factory, start, repeat)
+        engine.dispose()
+
+    same = orjson.loads(py_body) == orjson.loads(np_body)
+    print(f"rows:            {rows:,} transfers ({2 * rows:,} history items)")
+    print(f"python:          {py_time:.3f}s ({len(py_body):,} bytes)")
+    print(f"numpy json:      {np_time:.3f}s ({len(np_body):,} bytes, {py_time / np_time:.1f}x, identical: {same})")
+    print(f"numpy columnar:  {col_time:.3f}s ({len(col_body):,} bytes, {py_time / col_time:.1f}x)")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        run(rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Compare the ORM read path of GET /stock-transfers with the row-projection path.
+
+Runs against a throwaway SQLite database so no MySQL server is needed:
+
+    python benchmarks/bench_stock_transfers.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.database import Base
+from app.models import category, customer, organization  # noqa: F401 - register tables
+from app.models.product import Product
+from app.models.stock_transfer import StockTransfer
+from app.schemas.stock_transfer import StockTransferResponse
+from app.routers.stock_transfers import fetch_stock_transfer_page
+
+
+def seed(engine, rows):
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Product.__table__), [
+            {"id": i, "name": f"Product {i}", "price": 10.0, "stock": 1000}
+            for i in range(1, 501)
+        ])
+        conn.execute(insert(StockTransfer.__table__), [
+            {
+                "product_id": random.randint(1, 500),
+                "source_location": 1,
+                "destination_location": 2,
+                "quantity": random.randint(1, 50),
+                "status": random.choice(["pending", "processing", "completed", "cancelled"]),
+                "notes": "benchmark transfer",
+                "created_at": now - timedelta(seconds=i),
+                "updated_at": now - timedelta(seconds=i),
+                "source_locator_name": "A-01",
+                "source_product_name": "Product",
+                "destination_locator_name": "B-01",
+            }
+            for i in range(rows)
+        ])
+
+
+def orm_path(db):
+    """The previous implementation: ORM objects, hand-built dicts, model validation"""
+    transfers = db.query(StockTransfer).options(
+        joinedload(StockTransfer.product, innerjoin=False)
+    ).order_by(StockTransfer.created_at.desc()).all()
+    response_transfers = []
+    for transfer in transfers:
+        transfer_dict = {
+            "id": transfer.id,
+            "product_id": transfer.product_id,
+            "source_location": transfer.source_location,
+            "destination_location": transfer.destination_location,
+            "quantity": transfer.quantity,
+            "status": transfer.status,
+            "notes": transfer.notes,
+            "created_at": transfer.created_at,
+            "updated_at": transfer.updated_at,
+            "source_subinventory_name": transfer.source_subinventory_name,
+            "source_locator_name": transfer.source_locator_name,
+            "source_category_name": transfer.source_category_name,
+            "source_product_name": transfer.source_product_name,
+            "destination_subinventory_name": transfer.destination_subinventory_name,
+            "destination_locator_name": transfer.destination_locator_name,
+            "destination_category_name": transfer.destination_category_name,
+            "product": None
+        }
+        if transfer.product is not None:
+            transfer_dict["product"] = {"id": transfer.product.id, "name": transfer.product.name}
+        response_transfers.append(transfer_dict)
+    # What FastAPI does with response_model=List[StockTransferResponse]
+    adapter = TypeAdapter(List[StockTransferResponse])
+    return adapter.dump_json(adapter.validate_python(response_transfers))
+
+
+def projection_path(db):
+    body, _ = fetch_stock_transfer_page(db)
+    return body
+
+
+def best_of(fn, session_factory, repeat):
+    timings = []
+    for _ in range(repeat):
+        db = session_factory()
+        started = time.perf_counter()
+        body = fn(db)
+        timings.append(time.perf_counter() - started)
+        db.close()
+    return min(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        seed(engine, args.rows)
+        session_factory = sessionmaker(bind=engine)
+
+        orm_time, orm_bytes = best_of(orm_path, session_factory, args.repeat)
+        proj_time, proj_bytes = best_of(projection_path, session_factory, args.repeat)
+        engine.dispose()
+
+    print(f"rows:        {args.rows}")
+    print(f"orm:         {orm_time:.3f}s ({args.rows / orm_time:,.0f} rows/s, {orm_bytes:,} bytes)")
+    print(f"projection:  {proj_time:.3f}s ({args.rows / proj_time:,.0f} rows/s, {proj_bytes:,} bytes)")
+    print(f"speedup:     {orm_time / proj_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
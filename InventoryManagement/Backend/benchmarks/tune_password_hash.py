@@ -0,0 +1,94 @@
+"""
+Pick the password hashing cost that keeps a login verification within a target latency.
+
+Times verification on this machine for a range of bcrypt rounds and, when
+argon2-cffi is installed, argon2 time/memory costs, then prints the most
+expensive setting under the target as environment variables:
+
+    python benchmarks/tune_password_hash.py --target-ms 250
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passlib.hash import argon2
+
+from app.utils import build_password_context
+
+PASSWORD = "correct horse battery staple"
+
+
+def verify_ms(context, repeat):
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def tune_bcrypt(target_ms, repeat):
+    best = None
+    for rounds in range(10, 17):
+        elapsed = verify_ms(build_password_context("bcrypt", bcrypt_rounds=rounds), repeat)
+        print(f"bcrypt rounds={rounds:<2}                      {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            # Each extra round doubles the cost
+            break
+        best = ({"PASSWORD_SCHEME": "bcrypt", "BCRYPT_ROUNDS": rounds}, elapsed)
+    return best
+
+
+def tune_argon2(target_ms, repeat, parallelism):
+    best = None
+    for memory_mib in (19, 32, 64, 128, 256):
+        for time_cost in (1, 2, 3, 4):
+            settings = {
+                "argon2_time_cost": time_cost,
+                "argon2_memory_cost": memory_mib * 1024,
+                "argon2_parallelism": parallelism,
+            }
+            elapsed = verify_ms(build_password_context("argon2", **settings), repeat)
+            print(f"argon2 memory={memory_mib:>3} MiB time_cost={time_cost}    {elapsed:8.1f} ms")
+            if elapsed > target_ms:
+                break
+            # Prefer more memory over more passes: it is what makes GPU attacks expensive
+            best = ({
+                "PASSWORD_SCHEME": "argon2",
+                "ARGON2_TIME_COST": time_cost,
+                "ARGON2_MEMORY_COST": memory_mib * 1024,
+                "ARGON2_PARALLELISM": parallelism,
+            }, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parallelism", type=int, default=1, help="argon2 lanes per hash")
+    args = parser.parse_args()
+
+    results = [tune_bcrypt(args.target_ms, args.repeat)]
+    if argon2.has_backend():
+        results.append(tune_argon2(args.target_ms, args.repeat, args.parallelism))
+    else:
+        print("argon2: argon2-cffi not installed, skipped")
+
+    print()
+    for result in results:
+        if result is None:
+            print("No setting of this scheme verifies within the target")
+            continue
+        settings, elapsed = result
+        env = " ".join(f"{key}={value}" for key, value in settings.items())
+        print(f"{env}    # {elapsed:.1f} ms per verification")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+from app.models.product import Product
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def add_product_classification():
+    """Add the ABC/XYZ class columns to products and their indexes"""
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("products")}
+
+    with engine.begin() as connection:
+        for column in ("abc_class", "xyz_class"):
+            if column not in existing_columns:
+                logger.info(f"Adding {column} column to products table...")
+                connection.execute(text(f"ALTER TABLE products ADD COLUMN {column} VARCHAR(1) NULL"))
+            else:
+                logger.info(f"{column} column already exists.")
+
+    for index in Product.__table__.indexes:
+        if index.name in ("ix_products_abc_class_stock", "ix_products_xyz_class"):
+            index.create(bind=engine, checkfirst=True)
+
+    logger.info("Migration completed successfully. Run python -m app.classification to fill the classes.")
+
+if __name__ == "__main__":
+    add_product_classification()
@@ -0,0 +1,50 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app.models import category, customer, organization, user  # noqa: F401 - register tables
+from app.stock import rebuild_occupied_volume
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def add_space_utilization():
+    """Add product dimensions and locators.occupied_volume, then fill occupied_volume from stock_balances"""
+    inspector = inspect(engine)
+    product_columns = {column["name"] for column in inspector.get_columns("products")}
+    locator_columns = {column["name"] for column in inspector.get_columns("locators")}
+
+    with engine.begin() as connection:
+        for column in ("length", "width", "height"):
+            if column not in product_columns:
+                logger.info(f"Adding {column} column to products table...")
+                connection.execute(text(f"ALTER TABLE products ADD COLUMN {column} FLOAT NULL"))
+            else:
+                logger.info(f"{column} column already exists.")
+
+        if "occupied_volume" not in locator_columns:
+            logger.info("Adding occupied_volume column to locators table...")
+            connection.execute(text("ALTER TABLE locators ADD COLUMN occupied_volume FLOAT NOT NULL DEFAULT 0"))
+        else:
+            logger.info("occupied_volume column already exists.")
+
+    db = SessionLocal()
+    try:
+        rebuild_occupied_volume(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        db.close()
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    add_space_utilization()
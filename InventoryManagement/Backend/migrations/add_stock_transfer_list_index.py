@@ -0,0 +1,16 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.models.stock_transfer import StockTransfer
+
+def add_stock_transfer_list_index():
+    """Add the (created_at, id) index used to page through stock transfers"""
+    for index in StockTransfer.__table__.indexes:
+        if index.name == "ix_stock_transfers_created_at_id":
+            index.create(bind=engine, checkfirst=True)
+
+if __name__ == "__main__":
+    add_stock_transfer_list_index()
@@ -0,0 +1,16 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.models.stock_transfer import StockTransfer
+
+def add_stock_transfer_status_index():
+    """Add the (status, created_at) index used to bucket completed transfers by time"""
+    for index in StockTransfer.__table__.indexes:
+        if index.name == "ix_stock_transfers_status_created_at":
+            index.create(bind=engine, checkfirst=True)
+
+if __name__ == "__main__":
+    add_stock_transfer_status_index()
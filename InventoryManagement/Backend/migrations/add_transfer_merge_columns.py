@@ -0,0 +1,39 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def add_transfer_merge_columns():
+    """Add the consolidation audit columns to stock_transfers"""
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("stock_transfers")}
+
+    with engine.begin() as connection:
+        if "merged_into_id" not in existing_columns:
+            logger.info("Adding merged_into_id column to stock_transfers table...")
+            connection.execute(text("ALTER TABLE stock_transfers ADD COLUMN merged_into_id INTEGER NULL"))
+            if engine.dialect.name == "mysql":
+                connection.execute(text(
+                    "ALTER TABLE stock_transfers ADD CONSTRAINT fk_stock_transfers_merged_into "
+                    "FOREIGN KEY (merged_into_id) REFERENCES stock_transfers(id) ON DELETE SET NULL"
+                ))
+        else:
+            logger.info("merged_into_id column already exists.")
+
+        if "merged_transfer_ids" not in existing_columns:
+            logger.info("Adding merged_transfer_ids column to stock_transfers table...")
+            connection.execute(text("ALTER TABLE stock_transfers ADD COLUMN merged_transfer_ids TEXT NULL"))
+        else:
+            logger.info("merged_transfer_ids column already exists.")
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    add_transfer_merge_columns()
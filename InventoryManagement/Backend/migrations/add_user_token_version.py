@@ -0,0 +1,28 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def add_user_token_version():
+    """Add the token_version column used to revoke tokens on password and privilege changes"""
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("users")}
+
+    with engine.begin() as connection:
+        if "token_version" not in existing_columns:
+            logger.info("Adding token_version column to users table...")
+            connection.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
+        else:
+            logger.info("token_version column already exists.")
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    add_user_token_version()
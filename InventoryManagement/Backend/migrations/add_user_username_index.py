@@ -0,0 +1,24 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine
+from app.models.user import User
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def add_user_username_index():
+    """Add the username index used by the user list's prefix search"""
+    for index in User.__table__.indexes:
+        if index.name == "ix_users_username":
+            logger.info(f"Creating index {index.name} if missing...")
+            index.create(bind=engine, checkfirst=True)
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    add_user_username_index()
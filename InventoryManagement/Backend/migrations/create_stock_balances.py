@@ -0,0 +1,219 @@
+import sys
+import os
+import argparse
+import logging
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import update, delete, insert, select, and_, inspect
+from app.database import engine
+from app.models import customer, organization  # noqa: F401 - register tables
+from app.models.category import Category
+from app.models.product import Product
+from app.models.order import OrderItem, order_products
+from app.models.stock_transfer import StockTransfer
+from app.models.stock_balance import StockBalance
+from app.models.stock_movement import StockMovementDaily
+from app.models.stock_snapshot import StockSnapshot
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+products = Product.__table__
+categories = Category.__table__
+transfers = StockTransfer.__table__
+balances = StockBalance.__table__
+
+def repoint_order_products(connection, clone_id, canonical_id):
+    """Move legacy order_products rows to the canonical product, merging duplicates"""
+    rows = connection.execute(select(order_products).where(order_products.c.product_id == clone_id)).all()
+    for row in rows:
+        existing = connection.execute(select(order_products).where(and_(
+            order_products.c.order_id == row.order_id,
+            order_products.c.product_id == canonical_id
+        ))).first()
+        if existing:
+            connection.execute(update(order_products).where(and_(
+                order_products.c.order_id == row.order_id,
+                order_products.c.product_id == canonical_id
+            )).values(quantity=existing.quantity + row.quantity))
+            connection.execute(delete(order_products).where(and_(
+                order_products.c.order_id == row.order_id,
+                order_products.c.product_id == clone_id
+            )))
+        else:
+            connection.execute(update(order_products).where(and_(
+                order_products.c.order_id == row.order_id,
+                order_products.c.product_id == clone_id
+            )).values(product_id=canonical_id))
+
+def fold_product_rows(connection, table, key_columns, value_columns, clone_id, canonical_id):
+    """
+    Add a clone's rows of a per-product table (snapshots, movement ledger)
+    into the canonical product's rows with the same key, then delete them
+    """
+    keys = [table.c[name] for name in key_columns]
+    values = [table.c[name] for name in value_columns]
+    clone_rows = connection.execute(select(*keys, *values).where(table.c.product_id == clone_id)).all()
+    for row in clone_rows:
+        key = dict(zip(key_columns, row[:len(keys)]))
+        amounts = dict(zip(value_columns, row[len(keys):]))
+        match = and_(table.c.product_id == canonical_id, *[column == key[column.name] for column in keys])
+        existing = connection.execute(select(*values).where(match)).first()
+        if existing:
+            connection.execute(update(table).where(match).values(
+                {name: (current or 0) + (amounts[name] or 0) for name, current in zip(value_columns, existing)}
+            ))
+        else:
+            connection.execute(insert(table).values(product_id=canonical_id, **key, **amounts))
+    connection.execute(delete(table).where(table.c.product_id == clone_id))
+
+def find_clones(connection):
+    """
+    Map each provable clone to the product it was cloned from.
+
+    Completing a transfer looked up a product with the source's name in the
+    destination category and created one there when missing. So a product is
+    a clone only when a completed transfer of a same-named product targeted
+    its category; same name, description and price alone is not proof. A
+    target whose description or price differs was a distinct product that
+    only absorbed the stock, and is left alone. Chains of transfers resolve
+    to the lowest id.
+    """
+    category_ids = dict(connection.execute(select(categories.c.name, categories.c.id)).all())
+    product_rows = {
+        row.id: row for row in connection.execute(
+            select(products.c.id, products.c.name, products.c.description, products.c.price, products.c.category_id)
+        )
+    }
+    by_name_and_category = defaultdict(list)
+    for row in product_rows.values():
+        by_name_and_category[(row.name, row.category_id)].append(row)
+
+    parent = {}
+
+    def root(product_id):
+        while product_id in parent:
+            product_id = parent[product_id]
+        return product_id
+
+    completed = connection.execute(
+        select(
+            transfers.c.id, transfers.c.product_id,
+            transfers.c.destination_category_id, transfers.c.destination_category_name
+        )
+        .where(transfers.c.status == "completed")
+        .order_by(transfers.c.id)
+    ).all()
+    for transfer in completed:
+        source = product_rows.get(transfer.product_id)
+        destination_category_id = transfer.destination_category_id or category_ids.get(transfer.destination_category_name)
+        if not source or not destination_category_id:
+            continue
+        targets = [
+            row for row in by_name_and_category[(source.name, destination_category_id)]
+            if row.id != source.id
+        ]
+        if len(targets) != 1:
+            if targets:
+                logger.warning(f"Transfer {transfer.id}: {len(targets)} products named '{source.name}' in category {destination_category_id}; not folding")
+            continue
+        target = targets[0]
+        if (target.description, target.price) != (source.description, source.price):
+            logger.warning(f"Transfer {transfer.id}: product {target.id} differs from {source.id} beyond its name; not folding")
+            continue
+        a, b = root(source.id), root(target.id)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    return {product_id: root(product_id) for product_id in parent}
+
+def create_stock_balances(dry_run=False):
+    """
+    Create the stock_balances table and fold the per-location product clones
+    made by stock transfer completion back into the product they came from.
+
+    Every product's stock is booked as a balance at its category's locator,
+    under the product it was cloned from for clones. With --dry-run the folds
+    are only listed, for review before the real run.
+
+    Run order: after the original schema scripts that add
+    stock_transfers.destination_category_id (add_category_id_to_transfers.py),
+    stock_transfers.destination_category_name (add_names_to_stock_transfers.py)
+    and categories.locator_id (category_location_migration.py), and before
+    add_space_utilization.py, which fills locators.occupied_volume from the
+    balances. Only the columns that exist at that point are read, so the
+    later migrations may run in any order afterwards. If add_space_utilization
+    already ran, run it again after this one. When stock_movement_daily or
+    stock_snapshots already exist, a folded clone's rows there are added into
+    the kept product's, so stock reconstruction stays correct.
+    """
+    StockBalance.__table__.create(bind=engine, checkfirst=True)
+    tables = set(inspect(engine).get_table_names())
+
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            if connection.execute(select(balances.c.id).limit(1)).first():
+                logger.info("stock_balances already populated, nothing to do.")
+                return
+
+            clones = find_clones(connection)
+            locator_ids = dict(connection.execute(select(categories.c.id, categories.c.locator_id)).all())
+            totals = defaultdict(int)
+            placed = defaultdict(int)  # (canonical product, locator) -> qty
+            for product_id, stock, category_id in connection.execute(
+                select(products.c.id, products.c.stock, products.c.category_id).order_by(products.c.id)
+            ):
+                canonical_id = clones.get(product_id, product_id)
+                stock = stock or 0
+                totals[canonical_id] += stock
+                locator_id = locator_ids.get(category_id)
+                if locator_id:
+                    placed[(canonical_id, locator_id)] += stock
+                elif stock:
+                    logger.warning(f"Product {product_id} has no locator; {stock} units stay unplaced")
+
+            for (product_id, locator_id), qty in placed.items():
+                if qty:
+                    connection.execute(insert(balances).values(product_id=product_id, locator_id=locator_id, qty=qty))
+
+            for product_id, canonical_id in sorted(clones.items()):
+                logger.info(f"Folding product {product_id} into {canonical_id}")
+                connection.execute(update(transfers).where(transfers.c.product_id == product_id).values(product_id=canonical_id))
+                order_items = OrderItem.__table__
+                connection.execute(update(order_items).where(order_items.c.product_id == product_id).values(product_id=canonical_id))
+                if "order_products" in tables:
+                    repoint_order_products(connection, product_id, canonical_id)
+                if "stock_snapshots" in tables:
+                    fold_product_rows(connection, StockSnapshot.__table__, ["day"], ["qty"], product_id, canonical_id)
+                if "stock_movement_daily" in tables:
+                    columns = {column["name"] for column in inspect(connection).get_columns("stock_movement_daily")}
+                    fold_product_rows(
+                        connection, StockMovementDaily.__table__, ["day", "locator_id"],
+                        [name for name in ("qty_in", "qty_out", "qty_adjusted") if name in columns],
+                        product_id, canonical_id
+                    )
+                connection.execute(delete(products).where(products.c.id == product_id))
+
+            for product_id, total in totals.items():
+                connection.execute(update(products).where(products.c.id == product_id).values(stock=total))
+
+            if dry_run:
+                transaction.rollback()
+                logger.info(f"Dry run: would fold {len(clones)} product clones.")
+            else:
+                transaction.commit()
+                logger.info(f"Folded {len(clones)} product clones into stock_balances.")
+        except Exception as e:
+            transaction.rollback()
+            logger.error(f"Migration failed: {e}")
+            raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create stock_balances and fold product clones")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without committing")
+    args = parser.parse_args()
+    create_stock_balances(dry_run=args.dry_run)
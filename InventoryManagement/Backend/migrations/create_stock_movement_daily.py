@@ -0,0 +1,101 @@
+import sys
+import os
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, delete, func, insert
+from app.database import engine
+from app.models import customer, organization, user  # noqa: F401 - register tables
+from app.models.product import Product
+from app.models.category import Category
+from app.models.order import Order, OrderItem
+from app.models.stock_transfer import StockTransfer
+from app.models.stock_movement import StockMovementDaily, UNASSIGNED_LOCATOR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Positions in the per-key [qty_in, qty_out] totals
+IN, OUT = 0, 1
+
+def as_day(value):
+    # func.date() returns a string on SQLite and a date on MySQL
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+def backfill_stock_movement_daily(rebuild=False):
+    """
+    Create stock_movement_daily and fill it from completed transfers and
+    approved orders.
+
+    Movements are dated by the row's updated_at, which is when it was
+    completed unless it was edited afterwards. The aggregation runs in the
+    database, so only one row per day, product, locator and direction is
+    read back.
+    """
+    StockMovementDaily.__table__.create(bind=engine, checkfirst=True)
+    movements = StockMovementDaily.__table__
+
+    with engine.begin() as connection:
+        if connection.execute(select(movements.c.id).limit(1)).first():
+            if not rebuild:
+                logger.info("stock_movement_daily already populated; pass --rebuild to recompute it.")
+                return
+            logger.info("Clearing stock_movement_daily...")
+            connection.execute(delete(movements))
+
+        totals = defaultdict(lambda: [0, 0])  # (day, product, locator) -> [in, out]
+
+        transfers = StockTransfer.__table__
+        transfer_day = func.date(transfers.c.updated_at)
+        for locator, direction in ((transfers.c.source_location, OUT), (transfers.c.destination_location, IN)):
+            rows = connection.execute(
+                select(transfer_day, transfers.c.product_id, locator, func.sum(transfers.c.quantity))
+                .where(transfers.c.status == "completed")
+                .group_by(transfer_day, transfers.c.product_id, locator)
+            ).all()
+            for day, product_id, locator_id, quantity in rows:
+                totals[(as_day(day), product_id, locator_id or UNASSIGNED_LOCATOR)][direction] += quantity or 0
+
+        # Approved orders are booked at the product's category locator
+        orders = Order.__table__
+        items = OrderItem.__table__
+        products = Product.__table__
+        categories = Category.__table__
+        order_day = func.date(orders.c.updated_at)
+        rows = connection.execute(
+            select(order_day, items.c.product_id, categories.c.locator_id, orders.c.order_type, func.sum(items.c.quantity))
+            .select_from(
+                items.join(orders, orders.c.id == items.c.order_id)
+                .join(products, products.c.id == items.c.product_id)
+                .outerjoin(categories, categories.c.id == products.c.category_id)
+            )
+            .where(orders.c.status == "completed")
+            .group_by(order_day, items.c.product_id, categories.c.locator_id, orders.c.order_type)
+        ).all()
+        for day, product_id, locator_id, order_type, quantity in rows:
+            direction = OUT if order_type == "sell" else IN
+            totals[(as_day(day), product_id, locator_id or UNASSIGNED_LOCATOR)][direction] += quantity or 0
+
+        if totals:
+            connection.execute(insert(movements), [
+                {"day": day, "product_id": product_id, "locator_id": locator_id, "qty_in": qty_in, "qty_out": qty_out}
+                for (day, product_id, locator_id), (qty_in, qty_out) in totals.items()
+            ])
+        logger.info(f"Wrote {len(totals)} daily movement rows.")
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and backfill the stock_movement_daily rollup")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the rollup even if it already has rows")
+    args = parser.parse_args()
+    backfill_stock_movement_daily(rebuild=args.rebuild)
@@ -0,0 +1,49 @@
+import sys
+import os
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from app.database import engine, SessionLocal
+from app.models import category, customer, organization, user  # noqa: F401 - register tables
+from app.models.stock_snapshot import StockSnapshot
+from app.snapshots import take_stock_snapshot
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def create_stock_snapshots():
+    """
+    Add the qty_adjusted ledger column, create stock_snapshots and take the
+    first snapshot.
+
+    Adjustments made before this migration were not recorded, so stock can
+    only be reconstructed exactly from this point on.
+    """
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("stock_movement_daily")}
+    with engine.begin() as connection:
+        if "qty_adjusted" not in existing_columns:
+            logger.info("Adding qty_adjusted column to stock_movement_daily table...")
+            connection.execute(text("ALTER TABLE stock_movement_daily ADD COLUMN qty_adjusted INTEGER NOT NULL DEFAULT 0"))
+        else:
+            logger.info("qty_adjusted column already exists.")
+
+    StockSnapshot.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        take_stock_snapshot(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Migration failed: {e}")
+        raise
+    finally:
+        db.close()
+
+    logger.info("Migration completed successfully.")
+
+if __name__ == "__main__":
+    create_stock_snapshots()
@@ -0,0 +1,260 @@
+"""
+Regression checks for stock and token handling.
+
+Runs the app in-process against a throwaway SQLite database, so no server or
+MySQL is needed:
+
+    python test_stock_regressions.py
+    python -m pytest test_stock_regressions.py
+"""
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure the app before it is imported
+DB_DIR = tempfile.mkdtemp(prefix="inventory-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DB_DIR, 'test.db')}"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("JWT_REFRESH_SECRET_KEY", "test-refresh-secret")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["STATELESS_AUTH"] = "true"
+
+from fastapi.testclient import TestClient
+
+from app.database import Base, engine, SessionLocal
+from app.main import app
+from app.routers import orders, stock_transfers
+from app.models import customer, organization  # noqa: F401 - register tables
+from app.models.category import Category
+from app.models.organization import Locator
+from app.models.product import Product
+from app.models.stock_balance import StockBalance
+from app.models.stock_transfer import StockTransfer
+from app.models.user import User
+from app.utils import create_access_token, hash_password, token_claims
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Keep the PDF reports written by order and transfer routes out of app/reports
+orders.REPORTS_DIR = stock_transfers.REPORTS_DIR = DB_DIR
+
+Base.metadata.create_all(bind=engine)
+client = TestClient(app)
+
+
+def create_user(email, privileges=3):
+    db = SessionLocal()
+    try:
+        user = User(email=email, username=email.split("@")[0], hashed_password=hash_password("password"), privileges=privileges)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    finally:
+        db.close()
+
+
+def auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token(token_claims(user))}"}
+
+
+ADMIN = create_user("admin@example.com")
+HEADERS = auth_headers(ADMIN)
+
+
+def create_locators(*codes):
+    db = SessionLocal()
+    try:
+        locators = [Locator(code=code, length=10, width=10, height=10) for code in codes]
+        db.add_all(locators)
+        db.commit()
+        return [locator.id for locator in locators]
+    finally:
+        db.close()
+
+
+def create_product(name, stock, locator_id, placed=True):
+    """
+    A product whose category is stored at locator_id, with all its stock there
+    (or, with placed=False, not yet attributed to any locator)
+    """
+    db = SessionLocal()
+    try:
+        category = Category(name=f"{name} category", locator_id=locator_id)
+        db.add(category)
+        db.flush()
+        product = Product(name=name, price=1.0, stock=stock, category_id=category.id)
+        db.add(product)
+        db.flush()
+        if placed:
+            db.add(StockBalance(product_id=product.id, locator_id=locator_id, qty=stock))
+        db.commit()
+        return product.id
+    finally:
+        db.close()
+
+
+def create_transfer(product_id, source, destination, quantity):
+    db = SessionLocal()
+    try:
+        transfer = StockTransfer(
+            product_id=product_id, source_location=source, destination_location=destination,
+            quantity=quantity, status="pending"
+        )
+        db.add(transfer)
+        db.commit()
+        return transfer.id
+    finally:
+        db.close()
+
+
+def create_sell_order(product_id, quantity):
+    response = client.post(
+        "/orders/",
+        json={"type": "sell", "items": [{"product_id": product_id, "quantity": quantity, "price": 1.0}]},
+        headers=HEADERS
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def stock_of(product_id):
+    """(total stock, {locator_id: qty})"""
+    db = SessionLocal()
+    try:
+        total = db.query(Product.stock).filter(Product.id == product_id).scalar()
+        balances = dict(
+            db.query(StockBalance.locator_id, StockBalance.qty).filter(StockBalance.product_id == product_id).all()
+        )
+        return total, balances
+    finally:
+        db.close()
+
+
+def test_double_transfer_approval_and_completion():
+    """Approving or completing a transfer twice is a conflict and moves the stock once"""
+    source, destination = create_locators("T-SRC", "T-DST")
+    product_id = create_product("Transfer widget", 10, source)
+    transfer_id = create_transfer(product_id, source, destination, 4)
+
+    assert client.put(f"/stock-transfers/{transfer_id}/approve", headers=HEADERS).status_code == 200
+    assert client.put(f"/stock-transfers/{transfer_id}/approve", headers=HEADERS).status_code == 409
+    assert client.put(f"/stock-transfers/{transfer_id}/complete", headers=HEADERS).status_code == 200
+    assert client.put(f"/stock-transfers/{transfer_id}/complete", headers=HEADERS).status_code == 409
+    assert client.put(f"/stock-transfers/{transfer_id}/cancel", headers=HEADERS).status_code == 400
+
+    assert stock_of(product_id) == (10, {source: 6, destination: 4})
+
+
+def test_concurrent_completions_place_unplaced_stock_once():
+    """Two transfers of a product with unplaced stock completing together place it once"""
+    source, destination = create_locators("U-SRC", "U-DST")
+    product_id = create_product("Unplaced widget", 10, source, placed=False)
+    transfer_ids = [create_transfer(product_id, source, destination, 3) for _ in range(2)]
+    for transfer_id in transfer_ids:
+        assert client.put(f"/stock-transfers/{transfer_id}/approve", headers=HEADERS).status_code == 200
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        responses = list(pool.map(
+            lambda transfer_id: client.put(f"/stock-transfers/{transfer_id}/complete", headers=HEADERS),
+            transfer_ids
+        ))
+    assert [response.status_code for response in responses] == [200, 200], [r.text for r in responses]
+
+    assert stock_of(product_id) == (10, {source: 4, destination: 6})
+
+
+def test_double_order_approval():
+    """Approving an order twice is a conflict and deducts the stock once"""
+    (locator,) = create_locators("O-1")
+    product_id = create_product("Order widget", 10, locator)
+    order_id = create_sell_order(product_id, 3)
+
+    assert client.put(f"/orders/{order_id}/approve", headers=HEADERS).status_code == 200
+    assert client.put(f"/orders/{order_id}/approve", headers=HEADERS).status_code == 409
+
+    assert stock_of(product_id) == (7, {locator: 7})
+
+
+def test_oversell_rejected():
+    """Orders accepted against the same stock cannot both be approved past it"""
+    (locator,) = create_locators("S-1")
+    product_id = create_product("Scarce widget", 10, locator)
+
+    response = client.post(
+        "/orders/",
+        json={"type": "sell", "items": [{"product_id": product_id, "quantity": 11, "price": 1.0}]},
+        headers=HEADERS
+    )
+    assert response.status_code == 400, response.text
+
+    # Both pass the check at creation; only one fits at approval
+    first, second = create_sell_order(product_id, 6), create_sell_order(product_id, 6)
+    assert client.put(f"/orders/{first}/approve", headers=HEADERS).status_code == 200
+    response = client.put(f"/orders/{second}/approve", headers=HEADERS)
+    assert response.status_code == 400, response.text
+
+    assert stock_of(product_id) == (4, {locator: 4})
+
+
+def test_no_negative_balance_after_transfer_then_sale():
+    """A sale after the stock moved away is taken from where the stock now is"""
+    home, elsewhere = create_locators("N-HOME", "N-AWAY")
+    product_id = create_product("Moved widget", 10, home)
+    transfer_id = create_transfer(product_id, home, elsewhere, 10)
+    assert client.put(f"/stock-transfers/{transfer_id}/approve", headers=HEADERS).status_code == 200
+    assert client.put(f"/stock-transfers/{transfer_id}/complete", headers=HEADERS).status_code == 200
+
+    order_id = create_sell_order(product_id, 5)
+    assert client.put(f"/orders/{order_id}/approve", headers=HEADERS).status_code == 200
+
+    total, balances = stock_of(product_id)
+    assert total == 5
+    assert all(qty >= 0 for qty in balances.values()), balances
+    assert balances.get(elsewhere) == 5 and not balances.get(home)
+
+
+def test_revoked_token_version_rejected():
+    """A token issued before a privilege change stops working once it commits"""
+    user = create_user("worker@example.com", privileges=1)
+    old_headers = auth_headers(user)
+    assert client.get("/users/me", headers=old_headers).status_code == 200
+
+    db = SessionLocal()
+    try:
+        db_user = db.query(User).filter(User.id == user.id).first()
+        db_user.privileges = 2
+        db.commit()
+        db.refresh(db_user)
+        new_headers = auth_headers(db_user)
+    finally:
+        db.close()
+
+    assert client.get("/users/me", headers=old_headers).status_code == 401
+    response = client.get("/users/me", headers=new_headers)
+    assert response.status_code == 200 and response.json()["privileges"] == 2
+
+
+if __name__ == "__main__":
+    print("===== Stock and Token Regression Tests =====")
+    failed = 0
+    for name, test in list(globals().items()):
+        if not name.startswith("test_") or not callable(test):
+            continue
+        try:
+            test()
+            logger.info(f"PASS {name}")
+        except AssertionError as e:
+            failed += 1
+            logger.error(f"FAIL {name}: {e}")
+    sys.exit(1 if failed else 0)
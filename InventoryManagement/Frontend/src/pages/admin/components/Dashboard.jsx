@@ -37,76 +37,51 @@ const Dashboard = () => {
   const fetchDashboardData = async () => {
     try {
       setRefreshing(true);
-      const [ordersData, productsData, stockHistoryData] = await Promise.all([
-        fetchWithAuth('/orders'),
-        fetchWithAuth('/products'),
-        fetchWithAuth('/stock-history')
-      ]);
+      // One small pre-aggregated payload instead of the full product, order and history lists
+      const summary = await fetchWithAuth('/dashboard/summary');
 
-      // Process products by category
-      const categoryData = productsData.reduce((acc, product) => {
-        const categoryName = product.category?.name || 'Uncategorized';
-        acc[categoryName] = (acc[categoryName] || 0) + 1;
-        return acc;
-      }, {});
-
-      const categoryDistribution = Object.entries(categoryData).map(([name, value]) => ({
-        name,
-        value
+      const categoryDistribution = (summary.categories || []).map(category => ({
+        name: category.name,
+        value: category.products
       }));
 
       // Process recent orders
-      const recentActivities = (ordersData || []).slice(0, 5).map(order => ({
+      const recentActivities = (summary.recent_orders || []).map(order => ({
         type: 'Order',
         item: `Order #${order.id}`,
-        quantity: order.items?.length || 0,
+        quantity: order.items || 0,
         date: order.created_at,
         status: order.status || 'pending',
         total: order.total || 0
       }));
 
-      // Calculate other statistics
-      const totalProducts = productsData?.length || 0;
-      const lowStock = productsData?.filter(p => p?.stock < 20 && p?.stock > 0)?.length || 0;
-      const outOfStock = productsData?.filter(p => p?.stock === 0)?.length || 0;
-      const totalValue = productsData?.reduce((sum, p) => sum + ((p?.price || 0) * (p?.stock || 0)), 0) || 0;
-
       // Process real inventory data from stock history
       const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
       const currentMonth = new Date().getMonth();
       const last6Months = monthNames.slice(currentMonth - 5 < 0 ? 0 : currentMonth - 5, currentMonth + 1);
       
-      // Group stock history by month and type
+      // Group stock movements by month
       const monthlyData = {};
       last6Months.forEach(month => {
         monthlyData[month] = { inventory: 0, sales: 0, restock: 0 };
       });
       
-      if (stockHistoryData && stockHistoryData.length > 0) {
-        // Process actual stock history data
-        stockHistoryData.forEach(item => {
-          const date = new Date(item.date);
-          const month = monthNames[date.getMonth()];
-          
-          // Only include data from the last 6 months
-          if (last6Months.includes(month)) {
-            if (item.type === 'out') {
-              monthlyData[month].sales += item.quantity;
-            } else if (item.type === 'in') {
-              monthlyData[month].restock += item.quantity;
-            }
-          }
-        });
-      }
-      
-      // Calculate current inventory for each month
-      // Using total stock as a baseline for current inventory
-      const totalStockCount = productsData.reduce((sum, p) => sum + (p?.stock || 0), 0);
+      (summary.monthly_movements || []).forEach(item => {
+        // 'YYYY-MM-DD'; parsing it as a Date would shift it to UTC midnight
+        const month = monthNames[parseInt(item.month.slice(5, 7), 10) - 1];
+        
+        // Only include data from the last 6 months
+        if (last6Months.includes(month)) {
+          monthlyData[month].sales += item.qty_out;
+          monthlyData[month].restock += item.qty_in;
+        }
+      });
       
       // Create inventory data for chart
+      // Using total stock as a baseline for current inventory
       const inventoryData = last6Months.map(month => ({
         name: month,
-        inventory: totalStockCount,
+        inventory: summary.total_stock,
         sales: monthlyData[month].sales,
         restock: monthlyData[month].restock
       }));
@@ -114,10 +89,10 @@ const Dashboard = () => {
       // Update state with processed data
       setStats(prev => ({
         ...prev,
-        totalProducts,
-        lowStock,
-        outOfStock,
-        totalValue,
+        totalProducts: summary.total_products,
+        lowStock: summary.low_stock,
+        outOfStock: summary.out_of_stock,
+        totalValue: summary.stock_value,
         recentActivities,
         inventoryData,
         categoryDistribution: categoryDistribution.length > 0 ? categoryDistribution : prev.categoryDistribution
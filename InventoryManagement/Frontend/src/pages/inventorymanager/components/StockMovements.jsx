@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { fetchWithAuth } from '../../../utils/api';
+import { fetchWithAuth, subscribeToEvents } from '../../../utils/api';
 import { getOrganizationData, getCategoriesData, getLocatorPath, getLocatorCategories } from '../../../utils/organizationService';
 import { fetchProductsByCategory, invalidateProductsCache } from '../../../utils/productService';
 
@@ -86,12 +86,14 @@ const StockMovements = () => {
     fetchProducts();
     fetchCategories();
     
-    // Auto-refresh transfers every 30 seconds
-    const intervalId = setInterval(() => {
-      fetchTransfers(false); // Pass false to not show loading indicator for auto-refresh
-    }, 30000);
+    // Reload only when the server pushes a status change instead of polling;
+    // a reload also keeps the status filter and pending badge in sync
+    const unsubscribe = subscribeToEvents({
+      stock_transfer: () => fetchTransfers(false), // Pass false to not show loading indicator
+      reset: () => fetchTransfers(false)
+    });
     
-    return () => clearInterval(intervalId); // Cleanup on unmount
+    return () => unsubscribe(); // Cleanup on unmount
   }, [dateRange, filterStatus]);
 
   // Set up effect for filtering products based on selected category
@@ -34,7 +34,7 @@ const Dashboard = () => {
           fetchWithAuth('/organization'),
           fetchWithAuth('/categories'),
           fetchWithAuth('/stock-transfers'),
-          fetchWithAuth('/stock-history')
+          fetchWithAuth('/stock-history?bucket=month')
         ]);
       
       // Process products data
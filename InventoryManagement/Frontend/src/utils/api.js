@@ -218,3 +218,38 @@ export const fetchOrganizationEndpoint = async (path, options = {}) => {
     throw error;
   }
 }
+
+/**
+ * Subscribe to server-sent status change events
+ * @param {object} handlers - Map of event type ('stock_transfer', 'order', 'reset') to callback
+ * @returns {function} - Call to close the stream
+ */
+export const subscribeToEvents = (handlers = {}) => {
+  const tokens = JSON.parse(localStorage.getItem('tokens') || '{}');
+  if (!tokens.access_token) {
+    console.warn('No access token found for event stream');
+    return () => {};
+  }
+
+  // EventSource cannot send an Authorization header, so pass the token in the query
+  const source = new EventSource(
+    `${BASE_URL}/events/?access_token=${encodeURIComponent(tokens.access_token)}`
+  );
+
+  Object.entries(handlers).forEach(([type, handler]) => {
+    source.addEventListener(type, (event) => {
+      try {
+        handler(JSON.parse(event.data));
+      } catch (error) {
+        console.error(`Error handling ${type} event:`, error);
+      }
+    });
+  });
+
+  source.onerror = () => {
+    // The browser reconnects on its own and resumes with Last-Event-ID
+    console.warn('Event stream interrupted, reconnecting...');
+  };
+
+  return () => source.close();
+};